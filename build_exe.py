@@ -4,6 +4,7 @@
 将 Instagram 监控脚本打包成独立的 Windows 可执行文件
 """
 
+import os
 import subprocess
 import sys
 import shutil
@@ -36,31 +37,43 @@ def install_pyinstaller():
 def clean_build():
     """清理之前的构建文件"""
     print("🧹 清理构建文件...")
-    dirs_to_remove = ['build', 'dist']
-    for dir_name in dirs_to_remove:
-        dir_path = Path(dir_name)
-        if dir_path.exists():
-            shutil.rmtree(dir_path)
-            print(f"   已删除: {dir_name}")
+    dirs_to_remove = ('build', 'dist')
     
-    # 删除 spec 文件（除了我们自定义的）
-    for spec_file in Path('.').glob('*.spec'):
-        if spec_file.name != 'IGDownloader.spec':
-            spec_file.unlink()
-            print(f"   已删除: {spec_file.name}")
+    # 只遍历一次当前目录：删除构建目录和多余的 spec 文件（除了我们自定义的）
+    with os.scandir('.') as it:
+        entries = list(it)
+    for entry in entries:
+        if entry.name in dirs_to_remove and entry.is_dir():
+            shutil.rmtree(entry.path)
+            print(f"   已删除: {entry.name}")
+        elif entry.name.endswith('.spec') and entry.name != 'IGDownloader.spec' and entry.is_file():
+            os.unlink(entry.path)
+            print(f"   已删除: {entry.name}")
 
 
-def build_exe():
-    """执行打包"""
+def build_exe(full_rebuild=False):
+    """执行打包
+    
+    Args:
+        full_rebuild: 是否清空 PyInstaller 缓存后完整重建（默认增量打包）
+    """
     print("\n🔨 开始打包...")
+    if full_rebuild:
+        print("   模式: 完整重建（清理 PyInstaller 缓存）")
+    else:
+        print("   模式: 增量打包（复用 PyInstaller 分析缓存）")
     print("=" * 50)
     
     cmd = [
         sys.executable, "-m", "PyInstaller",
         "IGDownloader.spec",  # 使用自定义 spec 文件
-        "--clean",  # 清理临时文件
+        "--noconfirm",  # 覆盖输出目录时不询问
     ]
     
+    # 仅在完整重建时清理临时文件，否则复用缓存加快打包
+    if full_rebuild:
+        cmd.append("--clean")
+    
     try:
         result = subprocess.run(cmd, check=True)
         print("\n" + "=" * 50)
@@ -94,6 +107,9 @@ def main():
     print("🚀 IGDownloader 打包工具")
     print("=" * 50)
     
+    # --full: 清空 PyInstaller 缓存完整重建
+    full_rebuild = "--full" in sys.argv
+    
     # 检查 PyInstaller
     if not check_pyinstaller():
         if input("是否安装 PyInstaller? (y/n): ").lower() == 'y':
@@ -108,7 +124,7 @@ def main():
         clean_build()
     
     # 执行打包
-    if build_exe():
+    if build_exe(full_rebuild=full_rebuild):
         show_info()
         
         # 询问是否复制到桌面
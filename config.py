@@ -4,10 +4,29 @@
 支持动态修改配置和数据目录选择
 """
 
+import functools
 import json
 import os
+import time
 from pathlib import Path
 
+# JSON 序列化：优先使用 orjson（更快），未安装时回退到标准库
+try:
+    import orjson
+    
+    # orjson.loads 可直接解析 memoryview（如 mmap），无需先复制成 bytes
+    HAS_ORJSON = True
+    loads = orjson.loads
+    
+    def dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+except ImportError:
+    HAS_ORJSON = False
+    loads = json.loads
+    
+    def dumps(obj):
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+
 # 配置文件路径（固定在当前目录）
 CONFIG_FILE = "settings.json"
 
@@ -37,34 +56,54 @@ DEFAULT_CONFIG = {
     # 重复检测设置
     "MAX_CONSECUTIVE_DUPLICATES": 3,
     "MAX_SCAN_RANGE": 50,
+    
+    # 并发设置 - 同时运行的 gallery-dl 进程数上限
+    "MAX_CONCURRENCY": 2,
 }
 
+# 默认配置的序列化结果（只序列化一次，供重置和首次初始化复用）
+DEFAULT_CONFIG_BYTES = dumps(DEFAULT_CONFIG)
 
-def get_data_dir():
-    """获取数据存储目录"""
-    # 首先检查环境变量（用于打包后的EXE）
-    env_dir = os.environ.get('IGDOWNLOADER_DATA_DIR', '')
-    if env_dir and Path(env_dir).exists():
-        return Path(env_dir)
-    
-    # 然后检查配置文件
-    if Path(DATA_DIR_CONFIG).exists():
-        try:
-            with open(DATA_DIR_CONFIG, 'r', encoding='utf-8') as f:
-                data_dir = f.read().strip()
-                if data_dir and Path(data_dir).exists():
-                    return Path(data_dir)
-        except:
-            pass
-    
-    # 最后检查settings.json中的配置
-    settings = load_settings()
-    data_dir = settings.get('DATA_DIR', '')
-    if data_dir and Path(data_dir).exists():
-        return Path(data_dir)
+
+def _read_data_dir_file():
+    """读取 .data_dir 中保存的数据目录，不存在或读取失败时返回空字符串"""
+    try:
+        with open(DATA_DIR_CONFIG, 'r', encoding='utf-8') as f:
+            return f.read().strip()
+    except OSError:
+        return ''
+
+
+def _resolve_data_dir():
+    """按优先级解析数据目录：环境变量 → .data_dir → settings.json → 当前目录
     
-    # 默认使用当前目录
-    return Path('.')
+    不预先检查目录是否存在，目录由 init_all_files 负责创建
+    """
+    data_dir = (
+        os.environ.get('IGDOWNLOADER_DATA_DIR', '')  # 环境变量（用于打包后的EXE）
+        or _read_data_dir_file()
+        or _read_settings().get('DATA_DIR', '')
+        or '.'  # 默认使用当前目录
+    )
+    return Path(data_dir)
+
+
+@functools.lru_cache(maxsize=1)
+def get_data_dir():
+    """获取数据存储目录（结果在进程内缓存，修改后需调用 invalidate_data_dir_cache）"""
+    return _resolve_data_dir()
+
+
+@functools.lru_cache(maxsize=1)
+def get_data_dir_str():
+    """数据目录的字符串形式（缓存，供热路径用 os.path.join 拼接）"""
+    return str(get_data_dir())
+
+
+def invalidate_data_dir_cache():
+    """清除数据目录缓存（数据目录变更后调用）"""
+    get_data_dir.cache_clear()
+    get_data_dir_str.cache_clear()
 
 
 def set_data_dir(data_dir):
@@ -78,51 +117,96 @@ def set_data_dir(data_dir):
         except Exception as e:
             return False, f"无法创建目录: {e}"
     
-    # 测试目录写入权限
-    try:
-        test_file = data_dir_path / '.write_test'
-        test_file.write_text('test', encoding='utf-8')
-        test_file.unlink()
-    except PermissionError:
-        return False, f"权限错误: 无法在 '{data_dir_path}' 中创建文件\n建议: 使用用户目录，如 D:\\MyData\\insdownload"
-    except Exception as e:
-        return False, f"写入测试失败: {e}"
-    
-    # 保存到配置文件
+    # 保存到配置文件（.data_dir 与 settings.json 在同一处写入，settings 只读写一次）
+    abs_dir = str(data_dir_path.absolute())
     try:
-        with open(DATA_DIR_CONFIG, 'w', encoding='utf-8') as f:
-            f.write(str(data_dir_path.absolute()))
+        # 内容未变化时跳过写入（例如重新选择当前目录）
+        try:
+            current = Path(DATA_DIR_CONFIG).read_text(encoding='utf-8').strip()
+        except OSError:
+            current = None
+        if current != abs_dir:
+            with open(DATA_DIR_CONFIG, 'w', encoding='utf-8') as f:
+                f.write(abs_dir)
         
         # 同时更新settings.json
-        set_config('DATA_DIR', str(data_dir_path.absolute()))
+        if not set_configs({'DATA_DIR': abs_dir}):
+            return False, "保存配置失败: 无法写入 settings.json"
         
-        return True, str(data_dir_path.absolute())
+        return True, abs_dir
+    except PermissionError as e:
+        return False, f"权限错误: 无法写入 '{e.filename}'\n建议: 使用用户目录，如 D:\\MyData\\insdownload"
     except Exception as e:
         return False, f"保存配置失败: {e}"
 
 
 def resolve_path(filename):
-    """将相对路径解析为基于数据目录的绝对路径"""
-    data_dir = get_data_dir()
-    return data_dir / filename
+    """将相对路径解析为基于数据目录的路径（返回字符串）"""
+    return os.path.join(get_data_dir_str(), filename)
 
 
-def load_settings():
-    """从配置文件加载设置"""
-    if Path(CONFIG_FILE).exists():
-        try:
-            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"加载配置失败: {e}")
+def atomic_write_bytes(path, data):
+    """先写入同目录临时文件再 os.replace 覆盖，避免写入中断导致文件损坏"""
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+# 设置缓存（按文件修改时间判断是否需要重新解析）
+_SETTINGS_CACHE = {"mtime": None, "data": None}
+
+
+def _read_settings():
+    """读取设置（文件未修改时直接返回缓存字典，调用方不得修改返回值）"""
+    try:
+        mtime = os.stat(CONFIG_FILE).st_mtime_ns
+    except FileNotFoundError:
+        _SETTINGS_CACHE["mtime"] = 0
+        _SETTINGS_CACHE["data"] = {}
+        return {}
+    except OSError:
+        mtime = None
+    
+    if mtime is not None and mtime == _SETTINGS_CACHE["mtime"]:
+        return _SETTINGS_CACHE["data"]
+    
+    try:
+        # 一次性读取字节后解析，跳过文本解码层
+        data = loads(Path(CONFIG_FILE).read_bytes())
+        _SETTINGS_CACHE["mtime"] = mtime
+        _SETTINGS_CACHE["data"] = data
+        return data
+    except Exception as e:
+        print(f"加载配置失败: {e}")
     return {}
 
 
+def _invalidate_settings_cache():
+    """清除设置缓存（绕过 save_settings 直接写文件后调用）"""
+    _SETTINGS_CACHE["mtime"] = None
+    _SETTINGS_CACHE["data"] = None
+
+
+def load_settings():
+    """从配置文件加载设置（返回浅拷贝，调用方修改不会污染缓存）"""
+    return dict(_read_settings())
+
+
 def save_settings(settings):
     """保存设置到配置文件"""
     try:
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(settings, f, indent=2, ensure_ascii=False)
+        payload = dumps(settings)
+        # 与现有文件内容完全相同时跳过写入
+        try:
+            unchanged = Path(CONFIG_FILE).read_bytes() == payload
+        except OSError:
+            unchanged = False
+        if not unchanged:
+            atomic_write_bytes(CONFIG_FILE, payload)
+        # 替换成功后刷新缓存
+        _SETTINGS_CACHE["mtime"] = os.stat(CONFIG_FILE).st_mtime_ns
+        _SETTINGS_CACHE["data"] = dict(settings)
         return True
     except Exception as e:
         print(f"保存配置失败: {e}")
@@ -131,49 +215,50 @@ def save_settings(settings):
 
 def get_config(key, default=None):
     """获取配置项"""
+    return _read_settings().get(key, DEFAULT_CONFIG.get(key, default))
+
+
+def set_configs(updates):
+    """批量设置配置项（一次读取、一次写入）
+    
+    Args:
+        updates: {配置项: 值} 字典
+    """
     settings = load_settings()
-    return settings.get(key, DEFAULT_CONFIG.get(key, default))
+    settings.update(updates)
+    saved = save_settings(settings)
+    if 'DATA_DIR' in updates:
+        invalidate_data_dir_cache()
+    return saved
 
 
 def set_config(key, value):
     """设置配置项"""
-    settings = load_settings()
-    settings[key] = value
-    return save_settings(settings)
+    return set_configs({key: value})
 
 
 def reset_to_defaults():
     """重置为默认配置"""
-    return save_settings(DEFAULT_CONFIG.copy())
+    try:
+        atomic_write_bytes(CONFIG_FILE, DEFAULT_CONFIG_BYTES)
+        _invalidate_settings_cache()
+        invalidate_data_dir_cache()  # 默认配置可能改变 DATA_DIR
+        return True
+    except Exception as e:
+        print(f"保存配置失败: {e}")
+        return False
 
 
 def get_all_config():
     """获取所有配置（合并默认和用户设置）"""
-    config = DEFAULT_CONFIG.copy()
-    config.update(load_settings())
-    return config
-
-
-# 初始化配置
-_settings = get_all_config()
-
-# 导出配置变量（保持向后兼容）
-ACCOUNTS_FILE = _settings["ACCOUNTS_FILE"]
-DOWNLOAD_DIR = _settings["DOWNLOAD_DIR"]
-ARCHIVE_FILE = _settings["ARCHIVE_FILE"]
-COOKIES_FILE = _settings["COOKIES_FILE"]
-PROXY = _settings["PROXY"]
-SLEEP_REQUEST = _settings["SLEEP_REQUEST"]
-SLEEP_DOWNLOAD = _settings["SLEEP_DOWNLOAD"]
-MAX_CONSECUTIVE_DUPLICATES = _settings["MAX_CONSECUTIVE_DUPLICATES"]
-MAX_SCAN_RANGE = _settings["MAX_SCAN_RANGE"]
+    return {**DEFAULT_CONFIG, **_read_settings()}
 
 
 def reload_config():
     """重新加载配置"""
     global ACCOUNTS_FILE, DOWNLOAD_DIR, ARCHIVE_FILE, COOKIES_FILE
     global PROXY, SLEEP_REQUEST, SLEEP_DOWNLOAD
-    global MAX_CONSECUTIVE_DUPLICATES, MAX_SCAN_RANGE
+    global MAX_CONSECUTIVE_DUPLICATES, MAX_SCAN_RANGE, MAX_CONCURRENCY
     
     _settings = get_all_config()
     
@@ -186,33 +271,57 @@ def reload_config():
     SLEEP_DOWNLOAD = _settings["SLEEP_DOWNLOAD"]
     MAX_CONSECUTIVE_DUPLICATES = _settings["MAX_CONSECUTIVE_DUPLICATES"]
     MAX_SCAN_RANGE = _settings["MAX_SCAN_RANGE"]
+    MAX_CONCURRENCY = _settings["MAX_CONCURRENCY"]
+
+
+# 本次运行实际使用的休眠范围 (最小秒数, 最大秒数)，由扫描流程开始时设置；(0, 0) 表示不休眠
+REQUEST_SLEEP = (0, 0)
+DOWNLOAD_SLEEP = (0, 0)
+
+
+def parse_sleep_range(value):
+    """
+    将休眠范围解析为 (最小秒数, 最大秒数) 整数元组
+    
+    Args:
+        value: 设置中的 "最小值-最大值" 字符串（如 "30-90"），或已解析的 (min, max) 元组
+    
+    Returns:
+        (min, max) 整数元组，最大值不小于最小值；格式无效时返回 (0, 0)（不休眠）
+    """
+    if isinstance(value, str):
+        range_min, sep, range_max = value.strip().partition('-')
+        if not (sep and range_min.isdecimal() and range_max.isdecimal()):
+            return (0, 0)
+        value = (range_min, range_max)
+    try:
+        range_min, range_max = (int(v) for v in value)
+    except (TypeError, ValueError):
+        return (0, 0)
+    range_min = max(0, range_min)
+    return (range_min, max(range_min, range_max))
 
 
 # ========== 账号管理 ==========
 
 def load_accounts():
     """从存档加载账号列表"""
-    data_dir = get_data_dir()
-    accounts_file = data_dir / get_config("ACCOUNTS_FILE", "accounts.json")
-    if accounts_file.exists():
-        try:
-            with open(accounts_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data.get("accounts", [])
-        except:
-            return []
-    return []
+    accounts_file = resolve_path(get_config("ACCOUNTS_FILE", "accounts.json"))
+    try:
+        with open(accounts_file, 'rb') as f:
+            data = loads(f.read())
+        return data.get("accounts", [])
+    except:
+        return []
 
 
 def save_accounts(accounts):
     """保存账号列表到存档"""
-    data_dir = get_data_dir()
-    accounts_file = data_dir / get_config("ACCOUNTS_FILE", "accounts.json")
+    accounts_file = resolve_path(get_config("ACCOUNTS_FILE", "accounts.json"))
     try:
         # 确保父目录存在
-        accounts_file.parent.mkdir(parents=True, exist_ok=True)
-        with open(accounts_file, 'w', encoding='utf-8') as f:
-            json.dump({"accounts": accounts}, f, indent=2, ensure_ascii=False)
+        os.makedirs(os.path.dirname(accounts_file) or '.', exist_ok=True)
+        atomic_write_bytes(accounts_file, dumps({"accounts": accounts}))
         return True
     except Exception as e:
         print(f"保存账号失败: {e}")
@@ -227,21 +336,24 @@ DEFAULT_ACCOUNTS = [
     # "natgeo",
 ]
 
-# 加载存档的账号
-ACCOUNTS = load_accounts()
+# 数据目录中需要初始化的文件：(配置项名称, 提示名称, 初始内容)
+# 初始内容在导入时序列化一次，init_all_files 只负责检查和写入
+_INIT_FILE_SPECS = (
+    ("ACCOUNTS_FILE", "账号文件", dumps({"accounts": DEFAULT_ACCOUNTS})),
+    ("ARCHIVE_FILE", "存档文件", b'{}'),
+    ("COOKIES_FILE", "Cookies文件", b''),
+)
 
-# 如果存档文件不存在（第一次运行），使用默认账号并创建存档
-if not Path(ACCOUNTS_FILE).exists():
-    ACCOUNTS = DEFAULT_ACCOUNTS.copy()
-    save_accounts(ACCOUNTS)
 
-
-def init_all_files(data_dir=None):
+def init_all_files(data_dir=None, settings=None):
     """初始化所有必要的文件和目录（用于首次运行或打包后的EXE）
     
     Args:
         data_dir: 指定的数据目录，None则使用get_data_dir()
+        settings: 提供文件名的配置字典（ACCOUNTS_FILE 等），None则使用get_all_config()
     """
+    if settings is None:
+        settings = get_all_config()
     created_files = []
     
     # 确定数据目录
@@ -259,70 +371,70 @@ def init_all_files(data_dir=None):
             created_files.append(f"❌ 无法创建数据目录: {e}")
             return created_files
     
-    # 测试目录写入权限
+    # 一次性列出数据目录，后续用集合判断文件是否存在（避免逐个 stat）
     try:
-        test_file = data_dir / '.write_test'
-        test_file.write_text('test', encoding='utf-8')
-        test_file.unlink()
-    except PermissionError:
-        created_files.append(f"❌ 权限错误: 无法在 '{data_dir}' 中创建文件")
-        created_files.append(f"   建议: 使用用户目录，如 D:\\MyData\\insdownload")
-        return created_files
-    except Exception as e:
-        created_files.append(f"❌ 写入测试失败: {e}")
+        with os.scandir(data_dir) as it:
+            existing = {entry.name for entry in it}
+    except OSError as e:
+        # 数据目录不可读或不是目录（例如 DATA_DIR 指向文件），报告后不再继续
+        created_files.append(f"❌ 无法读取数据目录: {e}")
         return created_files
     
-    # 1. 创建设置文件（固定在当前目录）
-    settings_path = Path(CONFIG_FILE)
-    if not settings_path.exists():
-        if save_settings(DEFAULT_CONFIG.copy()):
-            created_files.append(f"✅ 创建设置文件: {CONFIG_FILE}")
+    def exists(name):
+        # 配置中的文件名可能包含子目录，此时退回逐个检查
+        if os.sep in name or '/' in name:
+            return (data_dir / name).exists()
+        return name in existing
     
-    # 2. 创建账号文件（在数据目录）
-    accounts_path = data_dir / ACCOUNTS_FILE
-    if not accounts_path.exists():
+    # 收集所有缺失的文件：(路径, 初始内容, 提示名称)
+    pending = []
+    
+    # 1. 设置文件（固定在当前目录）
+    if not Path(CONFIG_FILE).exists():
+        pending.append((Path(CONFIG_FILE), DEFAULT_CONFIG_BYTES, "设置文件"))
+    
+    # 2. 账号、存档、cookies文件（在数据目录，文件名取自当前配置）
+    for key, label, payload in _INIT_FILE_SPECS:
+        filename = settings[key]
+        if not exists(filename):
+            pending.append((data_dir / filename, payload, label))
+    
+    # 统一写入缺失的文件（'xb' 独占创建，已存在则跳过，不会覆盖）
+    # 权限问题由真实写入的 PermissionError 给出提示，无需预先写文件探测
+    for path, payload, label in pending:
         try:
-            accounts_path.write_text(json.dumps({"accounts": DEFAULT_ACCOUNTS.copy()}, indent=2, ensure_ascii=False), encoding='utf-8')
-            created_files.append(f"✅ 创建账号文件: {accounts_path}")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'xb') as f:
+                f.write(payload)
+            created_files.append(f"✅ 创建{label}: {path}")
+        except FileExistsError:
+            pass
+        except PermissionError:
+            created_files.append(f"❌ 权限错误: 无法在 '{path.parent}' 中创建文件")
+            created_files.append(f"   建议: 使用用户目录，如 D:\\MyData\\insdownload")
+            return created_files
         except Exception as e:
-            created_files.append(f"❌ 无法创建账号文件: {e}")
+            created_files.append(f"❌ 无法创建{label}: {e}")
     
     # 3. 创建下载目录（在数据目录）
-    download_path = data_dir / DOWNLOAD_DIR
-    if not download_path.exists():
+    download_dir = settings["DOWNLOAD_DIR"]
+    download_path = data_dir / download_dir
+    if not exists(download_dir):
         try:
             download_path.mkdir(parents=True, exist_ok=True)
             created_files.append(f"✅ 创建下载目录: {download_path}")
         except Exception as e:
             created_files.append(f"❌ 无法创建下载目录: {e}")
     
-    # 4. 创建存档文件（在数据目录）
-    archive_path = data_dir / ARCHIVE_FILE
-    if not archive_path.exists():
-        try:
-            archive_path.write_text('{}', encoding='utf-8')
-            created_files.append(f"✅ 创建存档文件: {archive_path}")
-        except Exception as e:
-            created_files.append(f"❌ 无法创建存档文件: {e}")
-    
-    # 5. 创建cookies文件（在数据目录）
-    cookies_path = data_dir / COOKIES_FILE
-    if not cookies_path.exists():
-        try:
-            cookies_path.write_text('', encoding='utf-8')
-            created_files.append(f"✅ 创建Cookies文件: {cookies_path}")
-        except Exception as e:
-            created_files.append(f"❌ 无法创建Cookies文件: {e}")
-    
     # 显示数据目录位置
     if data_dir != Path('.'):
         created_files.append(f"📁 数据存储位置: {data_dir.absolute()}")
     
-    # 6. 创建初始化标志文件（标记已完成首次初始化）
+    # 4. 创建初始化标志文件（标记已完成首次初始化）
     init_flag_path = data_dir / '.initialized'
-    if not init_flag_path.exists():
+    if not exists('.initialized'):
         try:
-            init_flag_path.write_text(datetime.now().isoformat(), encoding='utf-8')
+            init_flag_path.write_bytes(str(int(time.time())).encode())
             created_files.append(f"✅ 首次初始化完成")
         except Exception as e:
             created_files.append(f"❌ 无法创建初始化标志: {e}")
@@ -337,6 +449,53 @@ def is_first_run():
     return not init_flag_path.exists()
 
 
-# 自动初始化所有文件（导入时执行）
-INIT_RESULTS = init_all_files()
+# ========== 延迟初始化 ==========
+# 导入本模块不再产生文件读写；首次访问下列导出变量（或调用 ensure_initialized）时才初始化
+
+# 导出配置变量（保持向后兼容）
+_LAZY_NAMES = frozenset({
+    "ACCOUNTS_FILE", "DOWNLOAD_DIR", "ARCHIVE_FILE", "COOKIES_FILE",
+    "PROXY", "SLEEP_REQUEST", "SLEEP_DOWNLOAD",
+    "MAX_CONSECUTIVE_DUPLICATES", "MAX_SCAN_RANGE", "MAX_CONCURRENCY",
+    "ACCOUNTS", "INIT_RESULTS",
+})
+
+_BOOTSTRAPPED = False
+
+
+def _bootstrap():
+    """加载配置和账号，并初始化所有文件"""
+    global _BOOTSTRAPPED, ACCOUNTS, INIT_RESULTS
+    # 先置位，初始化过程中访问导出变量时不会重复进入
+    _BOOTSTRAPPED = True
+    try:
+        # 初始化配置
+        reload_config()
+        
+        # 自动初始化所有文件（首次运行时会用默认账号创建账号存档）
+        INIT_RESULTS = init_all_files(settings=get_all_config())
+        
+        # 加载存档的账号
+        ACCOUNTS = load_accounts()
+    except BaseException:
+        # 初始化失败时复位，下次访问重新初始化，而不是停留在半初始化状态
+        _BOOTSTRAPPED = False
+        raise
+
+
+def ensure_initialized():
+    """确保配置已初始化（程序入口处调用，重复调用无开销）"""
+    if not _BOOTSTRAPPED:
+        _bootstrap()
+
+
+def __getattr__(name):
+    """首次访问导出变量时触发初始化（PEP 562）"""
+    if name in _LAZY_NAMES:
+        ensure_initialized()
+        try:
+            return globals()[name]
+        except KeyError:
+            pass
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
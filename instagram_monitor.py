@@ -4,21 +4,34 @@ Instagram 内容监控脚本 - 扫描测试版本（支持帖子和快拍分别
 功能：验证扫描能获取哪些信息
 """
 
+import asyncio
+import atexit
+import ctypes
+import functools
+import io
 import subprocess
 import json
+import mmap
 import os
 import re
+import shutil
+import stat
+import threading
 import time
 import random
 import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
 # ========== 打包环境检测 ==========
+@functools.lru_cache(maxsize=None)
 def get_gallery_dl_path():
     """
     获取 gallery-dl 可执行文件路径
     支持开发环境和 PyInstaller 打包后的环境
+    （安装位置在程序运行期间不会变化，只检测一次）
     """
     if getattr(sys, 'frozen', False):
         # PyInstaller 打包后的环境
@@ -43,14 +56,12 @@ def get_gallery_dl_path():
 def is_admin():
     """检查是否以管理员权限运行"""
     try:
-        import ctypes
         return ctypes.windll.shell32.IsUserAnAdmin()
     except:
         return False
 
 def run_as_admin():
     """请求以管理员权限重新运行"""
-    import ctypes
     ctypes.windll.shell32.ShellExecuteW(None, "runas", sys.executable, " ".join(sys.argv), None, 1)
     sys.exit(0)
 
@@ -62,6 +73,10 @@ def run_as_admin():
 import config
 
 
+# 路径分隔符（用于一次 str.endswith 判断输入是否以分隔符结尾）
+_PATH_SEPS = tuple(dict.fromkeys((os.sep, '/', '\\')))
+
+
 def validate_and_fix_path(path_str, path_type='file', create_if_missing=True):
     """
     验证并修复路径
@@ -87,18 +102,22 @@ def validate_and_fix_path(path_str, path_type='file', create_if_missing=True):
     # 如果是文件类型，检查是否有文件名
     if path_type == 'file':
         # 如果路径以分隔符结尾或没有扩展名，可能是目录
-        if path_str.endswith(os.sep) or path_str.endswith('/') or path_str.endswith('\\'):
+        if path_str.endswith(_PATH_SEPS):
             return False, path_str, "这是一个目录路径，请提供文件路径（例如: D:\\insdownload\\archive.json）"
         
         if not path.suffix:
             # 没有扩展名，可能是目录
             return False, path_str, f"'{path_str}' 看起来是目录，请提供文件路径（例如: {path_str}\\archive.json）"
     
-    # 检查路径是否存在
-    if path.exists():
-        if path_type == 'file' and path.is_dir():
+    # 检查路径是否存在（一次 stat 同时得到类型）
+    try:
+        mode = path.stat().st_mode
+    except (FileNotFoundError, NotADirectoryError):
+        mode = None
+    if mode is not None:
+        if path_type == 'file' and stat.S_ISDIR(mode):
             return False, path_str, f"'{path}' 是目录，但需要的是文件路径"
-        if path_type == 'dir' and path.is_file():
+        if path_type == 'dir' and stat.S_ISREG(mode):
             return False, path_str, f"'{path}' 是文件，但需要的是目录路径"
         return True, str(path), "路径有效"
     
@@ -126,7 +145,6 @@ def validate_and_fix_path(path_str, path_type='file', create_if_missing=True):
                         path.write_text('[]', encoding='utf-8')
                     elif 'setting' in path.name.lower() or 'config' in path.name.lower():
                         # 设置文件：默认配置
-                        import json
                         path.write_text(json.dumps(config.DEFAULT_CONFIG, indent=2, ensure_ascii=False), encoding='utf-8')
                     else:
                         # 其他 JSON 文件：空对象
@@ -153,14 +171,15 @@ def validate_and_fix_path(path_str, path_type='file', create_if_missing=True):
             error_msg += f"  3. 手动创建目录后再设置路径"
             return False, path_str, error_msg
         except Exception as e:
-            import traceback
             error_detail = traceback.format_exc()
             return False, path_str, f"创建路径失败: {e}\n{error_detail}"
     
     # 不自动创建，但检查父目录是否可写
     try:
         parent = path.parent
-        if not parent.exists():
+        try:
+            parent.stat()
+        except FileNotFoundError:
             return False, path_str, f"父目录不存在: {parent}"
         # 测试是否可写
         test_file = parent / '.write_test'
@@ -175,134 +194,586 @@ def ensure_directories_exist():
     """确保所有必要的目录和文件存在"""
     results = []
     
+    # 按父目录分组检查：每个目录只 scandir 一次，之后用名称集合判断是否存在
+    listings = {}
+    
+    def exists(path):
+        parent = str(path.parent)
+        if parent not in listings:
+            try:
+                with os.scandir(parent) as it:
+                    listings[parent] = {entry.name for entry in it}
+            except (FileNotFoundError, NotADirectoryError):
+                listings[parent] = set()
+        return path.name in listings[parent]
+    
     # 检查下载目录
     download_dir = Path(config.DOWNLOAD_DIR)
-    if not download_dir.exists():
+    if not exists(download_dir):
         try:
             download_dir.mkdir(parents=True, exist_ok=True)
             results.append(f"✅ 创建下载目录: {download_dir}")
         except Exception as e:
             results.append(f"❌ 无法创建下载目录: {e}")
     
-    # 检查存档文件
-    archive_file = Path(config.ARCHIVE_FILE)
-    if not archive_file.exists():
-        try:
-            archive_file.parent.mkdir(parents=True, exist_ok=True)
-            archive_file.write_text('{}', encoding='utf-8')
-            results.append(f"✅ 创建存档文件: {archive_file}")
-        except Exception as e:
-            results.append(f"❌ 无法创建存档文件: {e}")
-    
-    # 检查账号文件
-    accounts_file = Path(config.ACCOUNTS_FILE)
-    if not accounts_file.exists():
-        try:
-            accounts_file.parent.mkdir(parents=True, exist_ok=True)
-            accounts_file.write_text('[]', encoding='utf-8')
-            results.append(f"✅ 创建账号文件: {accounts_file}")
-        except Exception as e:
-            results.append(f"❌ 无法创建账号文件: {e}")
-    
-    # 检查设置文件
-    settings_file = Path(config.CONFIG_FILE)
-    if not settings_file.exists():
+    # 检查存档文件、账号文件、设置文件（以 'xb' 独占模式创建，已存在则跳过）
+    file_specs = (
+        (Path(config.ARCHIVE_FILE), "存档文件", b'{}'),
+        (Path(config.ACCOUNTS_FILE), "账号文件", b'[]'),
+        (Path(config.CONFIG_FILE), "设置文件", config.DEFAULT_CONFIG_BYTES),
+    )
+    for path, label, payload in file_specs:
+        if exists(path):
+            continue
         try:
-            settings_file.write_text(json.dumps(config.DEFAULT_CONFIG, indent=2, ensure_ascii=False), encoding='utf-8')
-            results.append(f"✅ 创建设置文件: {settings_file}")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'xb') as f:
+                f.write(payload)
+            results.append(f"✅ 创建{label}: {path}")
+        except FileExistsError:
+            pass
         except Exception as e:
-            results.append(f"❌ 无法创建设置文件: {e}")
+            results.append(f"❌ 无法创建{label}: {e}")
     
     return results
 
 
-def load_archive():
-    """加载已下载的内容记录"""
-    data_dir = config.get_data_dir()
-    archive_path = data_dir / config.ARCHIVE_FILE
-    if archive_path.exists():
-        try:
-            with open(archive_path, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-                if not content:
-                    # 文件为空，返回空字典
-                    return {}
-                return json.loads(content)
-        except json.JSONDecodeError as e:
-            print(f"⚠️  存档文件损坏: {archive_path}")
-            print(f"   错误: {e}")
-            print(f"   将使用空存档继续...")
-            return {}
-        except Exception as e:
-            print(f"⚠️  读取存档失败: {e}")
-            return {}
-    return {}
+# 存档追加日志超过该大小（字节）时合并回存档文件
+ARCHIVE_LOG_MAX_SIZE = 10 * 1024 * 1024
+
+
+@functools.lru_cache(maxsize=8)
+def _archive_paths(data_dir_str, archive_file):
+    """按数据目录和存档文件名缓存 (存档路径, 追加日志路径)，设置变更后参数不同自动重新计算"""
+    archive_path = Path(data_dir_str) / archive_file
+    return archive_path, archive_path.with_suffix('.log.jsonl')
+
+
+def get_archive_path():
+    """获取存档文件路径"""
+    return _archive_paths(config.get_data_dir_str(), config.ARCHIVE_FILE)[0]
+
+
+def get_archive_log_path():
+    """获取存档追加日志路径（每行一条 JSON 增量记录，与存档文件同目录）"""
+    return _archive_paths(config.get_data_dir_str(), config.ARCHIVE_FILE)[1]
+
+
+# 存档ID列表对应的已存在ID集合: {(账号, 'posts'/'stories'): (ID列表, ID集合)}
+# 列表对象被替换（重新加载、清除记录）后自动重建
+_ARCHIVE_SEEN = {}
+
+
+def merge_archive_entry(archive, account, add_posts, add_stories):
+    """将新增的帖子/快拍ID追加到内存中的存档（只检查新增ID是否已存在，保持顺序）"""
+    entry = archive.setdefault(account, {"posts": [], "stories": []})
+    for kind, new_ids in (("posts", add_posts), ("stories", add_stories)):
+        ids = entry.setdefault(kind, [])
+        if not new_ids:
+            continue
+        cached = _ARCHIVE_SEEN.get((account, kind))
+        if cached is not None and cached[0] is ids:
+            seen = cached[1]
+        else:
+            seen = set(ids)
+            _ARCHIVE_SEEN[(account, kind)] = (ids, seen)
+        for file_id in new_ids:
+            if file_id not in seen:
+                ids.append(file_id)
+                seen.add(file_id)
+    return entry
+
+
+def load_archive(status=None):
+    """
+    加载已下载的内容记录（存档文件 + 追加日志中的增量记录）
+    
+    Args:
+        status: 字典，不为 None 时写入 'complete'：存档和日志是否都完整读取（为 False 时不应据此重写存档）
+    """
+    if status is not None:
+        status['complete'] = False
+    complete = True
+    archive_path = get_archive_path()
+    # 重新加载后旧的ID集合不再对应任何存档
+    _ARCHIVE_SEEN.clear()
+    try:
+        # 空文件视为空存档
+        archive = config.loads(archive_path.read_bytes() or b'{}')
+    except FileNotFoundError:
+        archive = {}
+    except json.JSONDecodeError as e:
+        print(f"⚠️  存档文件损坏: {archive_path}")
+        print(f"   错误: {e}")
+        print(f"   将使用空存档继续...")
+        archive = {}
+        complete = False  # 损坏的存档文件留待用户处理，不用日志内容覆盖
+    except Exception as e:
+        print(f"⚠️  读取存档失败: {e}")
+        return {}
+    
+    # 重放追加日志（逐条检查，单条无效记录不影响其余记录）
+    try:
+        with open(get_archive_log_path(), 'rb') as f:
+            for line in f:
+                try:
+                    record = config.loads(line)
+                except ValueError:
+                    # 写入中断导致的不完整行，忽略
+                    continue
+                if not isinstance(record, dict) or not isinstance(record.get("account"), str):
+                    continue
+                add_posts = record.get("add_posts")
+                add_stories = record.get("add_stories")
+                merge_archive_entry(archive, record["account"],
+                                    add_posts if isinstance(add_posts, list) else [],
+                                    add_stories if isinstance(add_stories, list) else [])
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"⚠️  读取存档日志失败: {e}")
+        return archive
+    
+    if status is not None:
+        status['complete'] = complete
+    return archive
 
 
 def save_archive(archive):
-    """保存已下载的内容记录"""
-    data_dir = config.get_data_dir()
-    archive_path = data_dir / config.ARCHIVE_FILE
+    """保存已下载的内容记录（完整写入存档文件，并清空追加日志）"""
+    archive_path = get_archive_path()
     # 确保父目录存在
     archive_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(archive_path, 'w', encoding='utf-8') as f:
-        json.dump(archive, f, indent=2, ensure_ascii=False)
+    config.atomic_write_bytes(archive_path, config.dumps(archive))
+    try:
+        os.remove(get_archive_log_path())
+    except FileNotFoundError:
+        pass
+
+
+def compact_archive():
+    """将追加日志合并回存档文件（日志不存在时不做任何操作）"""
+    try:
+        if get_archive_log_path().exists():
+            status = {}
+            archive = load_archive(status)
+            if status['complete']:
+                save_archive(archive)
+            else:
+                # 读取不完整时保留日志，避免用不完整的存档覆盖并删除日志
+                print(f"⚠️  存档或日志未完整读取，暂不合并: {get_archive_log_path()}")
+    except Exception as e:
+        print(f"⚠️  合并存档日志失败: {e}")
+
+
+@functools.lru_cache(maxsize=8)
+def _resolve_cookies_path(cookies_file, data_dir_str):
+    """按 cookies 文件名和数据目录缓存检测结果（保存 cookies 后需调用 cache_clear()）"""
+    if os.path.exists(cookies_file):
+        return cookies_file
+    return os.path.join(data_dir_str, cookies_file)
+
+
+def get_cookies_path():
+    """获取 cookies 文件路径（优先当前目录，避免data_dir权限问题；不存在时使用data_dir）"""
+    return _resolve_cookies_path(config.COOKIES_FILE, config.get_data_dir_str())
+
 
+# 批量扫描时在文件名前加上用户名，用于区分每行输出属于哪个账号
+# （其余部分与 gallery-dl instagram 默认文件名格式一致）
+BATCH_FILENAME_FORMAT = "{username}@{sidecar_media_id:?/_/}{media_id}.{extension}"
 
-def run_gallery_dl_scan_posts(url, downloaded_ids, max_range=None):
+
+def iter_gallery_dl_output(cmd, timeout, status, stderr_sink=None):
     """
-    扫描帖子（Posts），遇到2个连续重复则停止扫描，或达到最大范围停止
+    运行 gallery-dl 并逐行产出标准输出（边运行边解析，不缓存全部输出）
+    
+    提前结束迭代并调用生成器的 close() 会立即终止 gallery-dl 进程
     
     Args:
-        url: 账号URL
-        downloaded_ids: 已下载的完整ID集合（含扩展名）
-        max_range: 最大扫描范围（媒体文件数量），None表示不限制
+        cmd: 命令参数列表
+        timeout: 超时时间（秒），超时后终止进程并抛出 subprocess.TimeoutExpired
+        status: 字典，进程结束后写入 'returncode'
+        stderr_sink: 列表，不为 None 时在后台线程收集标准错误输出；None 表示丢弃
+    """
+    proc = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE if stderr_sink is not None else subprocess.DEVNULL,
+        text=True,
+        encoding='utf-8',
+        errors='ignore',
+        bufsize=1
+    )
+    timed_out = []
+    
+    def on_timeout():
+        timed_out.append(True)
+        proc.kill()
+    
+    timer = threading.Timer(timeout, on_timeout)
+    timer.start()
+    stderr_reader = None
+    if stderr_sink is not None:
+        # 同时读取标准错误，避免其管道写满后阻塞 gallery-dl
+        stderr_reader = threading.Thread(target=lambda: stderr_sink.append(proc.stderr.read()), daemon=True)
+        stderr_reader.start()
+    finished = False
+    try:
+        for line in proc.stdout:
+            yield line
+        finished = True
+    finally:
+        timer.cancel()
+        if not finished and proc.poll() is None:
+            # 调用方提前结束迭代或出错，终止进程
+            proc.terminate()
+        status['returncode'] = proc.wait()
+        proc.stdout.close()
+        if stderr_reader is not None:
+            stderr_reader.join()
+            proc.stderr.close()
+    
+    if timed_out:
+        raise subprocess.TimeoutExpired(cmd, timeout)
+
+
+def run_gallery_dl_streaming(cmd, timeout, on_line=None):
+    """
+    运行 gallery-dl 并逐行处理标准输出（不缓存完整输出），同时收集标准错误
+    
+    Args:
+        cmd: 命令参数列表
+        timeout: 超时时间（秒），超时抛出 subprocess.TimeoutExpired
+        on_line: 每行输出（已去除首尾空白、跳过空行）的回调，None表示忽略输出
     
     Returns:
-        (media_list, success, stopped_early): 媒体信息列表、是否成功、是否提前终止
+        (returncode, stderr): gallery-dl 返回码、标准错误输出
     """
-    # 从已下载的完整ID中提取post_id集合（用于帖子级别的重复检测）
-    downloaded_post_ids = set()
-    for full_id in downloaded_ids:
-        # 去掉扩展名，提取post_id（下划线前部分）
-        id_without_ext = full_id.rsplit('.', 1)[0] if '.' in full_id else full_id
-        post_id = id_without_ext.split('_')[0]
-        downloaded_post_ids.add(post_id)
+    status = {}
+    stderr_sink = []
+    for line in iter_gallery_dl_output(cmd, timeout, status, stderr_sink):
+        line = line.strip()
+        if line and on_line is not None:
+            on_line(line)
+    return status['returncode'], "".join(stderr_sink)
+
+
+async def run_gallery_dl_async(cmd, timeout, on_line, semaphore=None, input_lines=None, stderr_sink=None):
+    """
+    异步运行 gallery-dl，逐行读取输出并交给 on_line 处理（网络等待期间可同时运行其他扫描）
     
-    # 使用当前目录的cookies文件（避免data_dir权限问题）
-    cookies_path = config.COOKIES_FILE
-    if not Path(cookies_path).exists():
-        # 如果当前目录不存在，尝试使用data_dir
-        data_dir = config.get_data_dir()
-        cookies_path = str(data_dir / config.COOKIES_FILE)
+    Args:
+        cmd: 命令参数列表
+        timeout: 超时时间（秒），超时后终止进程并抛出 asyncio.TimeoutError
+        on_line: 每行输出的回调，参数为解码后的行文本；返回 True 时停止读取并终止 gallery-dl
+        semaphore: 限制同时运行进程数的 asyncio.Semaphore，None表示不限制
+        input_lines: 写入进程标准输入的行（配合 "--input-file -" 使用），None表示不使用标准输入
+        stderr_sink: 列表，不为 None 时收集标准错误输出；None 表示丢弃
     
-    # 构建命令
+    Returns:
+        int: gallery-dl 返回码
+    """
+    if semaphore is not None:
+        async with semaphore:
+            return await run_gallery_dl_async(cmd, timeout, on_line, input_lines=input_lines, stderr_sink=stderr_sink)
+    
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=asyncio.subprocess.PIPE if input_lines is not None else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE if stderr_sink is not None else asyncio.subprocess.DEVNULL
+    )
+    
+    async def feed():
+        # 与读取输出同时进行，避免双方管道缓冲区写满时互相等待
+        try:
+            proc.stdin.write("".join(f"{line}\n" for line in input_lines).encode('utf-8'))
+            await proc.stdin.drain()
+            proc.stdin.close()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # 进程已被提前终止
+    
+    async def consume():
+        async for raw in proc.stdout:
+            if on_line(raw.decode('utf-8', errors='ignore')):
+                # 调用方要求提前结束，终止进程（其余输出不再读取；进程已退出时无需终止）
+                if proc.returncode is None:
+                    proc.terminate()
+                break
+        return await proc.wait()
+    
+    async def collect_stderr():
+        # 与读取标准输出同时进行，避免标准错误管道写满后阻塞 gallery-dl
+        stderr_sink.append((await proc.stderr.read()).decode('utf-8', errors='ignore'))
+    
+    async def run():
+        jobs = [consume()]
+        if input_lines is not None:
+            jobs.append(feed())
+        if stderr_sink is not None:
+            jobs.append(collect_stderr())
+        return (await asyncio.gather(*jobs))[0]
+    
+    try:
+        return await asyncio.wait_for(run(), timeout=timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise
+
+
+async def run_gallery_dl_scan_batch(accounts, include, max_range=None, semaphore=None, downloaded_post_ids=None):
+    """
+    使用一次 gallery-dl 调用扫描多个账号（所有账号共享一次进程启动开销）
+    
+    提供 downloaded_post_ids 时按帖子检测连续重复（与 run_gallery_dl_scan_posts 的判断一致）：
+    账号达到重复阈值后不再记录其后续输出；最后一个账号达到阈值时立即终止 gallery-dl
+    
+    Args:
+        accounts: 账号列表
+        include: 扫描内容类型，'posts' 或 'stories'
+        max_range: 最大扫描范围（每个账号的媒体文件数量），None表示不限制
+        semaphore: 限制同时运行进程数的 asyncio.Semaphore
+        downloaded_post_ids: {账号: 已下载的post_id集合}，None 表示不提前终止
+    
+    Returns:
+        (outputs, returncodes): {账号: 输出行列表}、{账号: 返回码}（批量扫描本身失败时为 None）
+    """
+    urls = [f"https://www.instagram.com/{account}/" for account in accounts]
     cmd = [
         get_gallery_dl_path(),
         "--simulate",
         "--proxy", config.PROXY,
-        "--cookies", cookies_path,
-        "-o", "extractor.instagram.include=posts",
+        "--cookies", get_cookies_path(),
+        "-o", f"extractor.instagram.include={include}",
+        "-f", BATCH_FILENAME_FORMAT,
     ]
-    
-    # 如果设置了最大扫描范围，使用 --range 参数限制 gallery-dl 的输出
-    # 注意：--range 限制的是媒体文件数量
     if max_range:
         cmd.extend(["--range", f"1-{max_range}"])
+    # 账号URL通过标准输入传给 gallery-dl，账号多时不受命令行长度限制
+    cmd.extend(["--input-file", "-"])
+    
+    # 超时时间按账号数量放大（单账号: 帖子120秒，快拍60秒）
+    timeout = (120 if include == 'posts' else 60) * len(accounts)
+    
+    # 按文件名中的用户名前缀拆分输出；gallery-dl 按顺序处理各个URL，
+    # 前缀不是监控账号的行（如合作帖子）归属当前正在扫描的账号
+    account_map = {account.lower(): account for account in accounts}
+    outputs = {account: [] for account in accounts}
+    current = accounts[0]
+    
+    # 连续重复检测状态（gallery-dl 按顺序处理各个URL，只有最后一个账号停止时才值得终止进程）
+    last_account = accounts[-1]
+    max_duplicates = config.MAX_CONSECUTIVE_DUPLICATES
+    last_post_ids = {}
+    duplicate_counts = dict.fromkeys(accounts, 0)
+    finished = set()
+    stopped = False
+    
+    def on_line(line):
+        nonlocal current, stopped
+        line = line.strip()
+        skipped = line.startswith('# ')
+        if skipped:
+            line = line[2:]
+        username, sep, filename = line.partition('@')
+        if not sep:
+            return False
+        current = account_map.get(username.lower(), current)
+        if current in finished:
+            return False
+        outputs[current].append(f"# {filename}" if skipped else filename)
+        
+        if downloaded_post_ids is None:
+            return False
+        m = _LINE_RE.match(filename)
+        if not m:
+            return False
+        post_id = m.group(2)
+        if post_id == last_post_ids.get(current):
+            return False
+        last_post_ids[current] = post_id
+        if post_id in downloaded_post_ids.get(current, ()):
+            duplicate_counts[current] += 1
+            if duplicate_counts[current] >= max_duplicates:
+                finished.add(current)
+                if current == last_account:
+                    stopped = True
+                    return True
+        return False
+    
+    stderr_sink = []
+    try:
+        returncode = await run_gallery_dl_async(cmd, timeout, on_line, semaphore, urls, stderr_sink)
+    except asyncio.TimeoutError:
+        print(f"  [错误] 批量扫描超时 ({include})")
+        return {}, None
+    except Exception as e:
+        print(f"  [错误] {e}")
+        return {}, None
+    
+    stderr = "".join(stderr_sink)
+    if stopped and not stderr.strip():
+        # 进程是因提前终止才返回非零，不代表扫描失败
+        returncode = 0
+    return outputs, batch_account_returncodes(accounts, outputs, returncode, stderr)
+
+
+def batch_account_returncodes(accounts, outputs, returncode, stderr):
+    """
+    将一次批量 gallery-dl 调用的返回码分配到各个账号
+    
+    gallery-dl 只有一个退出码，某个账号失败（如私密账号）会让整个进程返回非零；
+    有输出的账号视为成功，无输出的账号在标准错误中提到其用户名时视为失败，
+    无法从标准错误判断是哪个账号时，所有无输出的账号都视为失败
+    
+    Args:
+        accounts: 账号列表
+        outputs: {账号: 输出行列表}
+        returncode: gallery-dl 返回码
+        stderr: gallery-dl 标准错误输出
+    
+    Returns:
+        {账号: 返回码}
+    """
+    if returncode == 0:
+        return dict.fromkeys(accounts, 0)
+    
+    stderr_lower = stderr.lower()
+    silent = [account for account in accounts if not outputs.get(account)]
+    failed = {
+        account for account in silent
+        if re.search(rf'(?<![\w.]){re.escape(account.lower())}(?![\w.])', stderr_lower)
+    }
+    if not failed:
+        failed = set(silent)
+    return {account: (returncode if account in failed else 0) for account in accounts}
+
+
+async def scan_accounts_batch_async(accounts, max_range=None, downloaded_post_ids=None):
+    """并发批量扫描帖子和快拍（两个 gallery-dl 进程同时运行）"""
+    semaphore = asyncio.Semaphore(max(1, int(config.MAX_CONCURRENCY)))
+    posts_task = asyncio.create_task(
+        run_gallery_dl_scan_batch(accounts, 'posts', max_range, semaphore, downloaded_post_ids)
+    )
+    stories_task = asyncio.create_task(run_gallery_dl_scan_batch(accounts, 'stories', None, semaphore))
+    return await asyncio.gather(posts_task, stories_task)
+
+
+def scan_accounts_batch(accounts, max_range=None, archive=None):
+    """
+    批量扫描所有账号的帖子和快拍（每种内容只启动一次 gallery-dl，两者并发运行）
+    
+    Args:
+        accounts: 账号列表
+        max_range: 最大扫描范围（每个账号的媒体文件数量），None表示不限制
+        archive: 存档数据，提供时帖子扫描遇到连续重复即提前结束；None 表示读取全部输出
+    
+    Returns:
+        {账号: {"posts": (输出行列表, 返回码), "stories": (输出行列表, 返回码)}}，
+        返回码按账号分别判断，批量扫描本身失败时为 None
+    """
+    print(f"\n  [批量扫描] {len(accounts)} 个账号的帖子和快拍")
+    downloaded_post_ids = None
+    if archive is not None:
+        downloaded_post_ids = {
+            account: get_downloaded_post_ids(account, set(archive.get(account, {}).get("posts", [])))
+            for account in accounts
+        }
+    (posts_outputs, posts_rcs), (stories_outputs, stories_rcs) = asyncio.run(
+        scan_accounts_batch_async(accounts, max_range, downloaded_post_ids)
+    )
+    
+    prefetched = {}
+    for account in accounts:
+        prefetched[account] = {
+            "posts": (posts_outputs.get(account, []), posts_rcs[account] if posts_rcs is not None else None),
+            "stories": (stories_outputs.get(account, []), stories_rcs[account] if stories_rcs is not None else None),
+        }
+    return prefetched
+
+
+# gallery-dl 模拟输出中的帖子媒体文件名: [# ]帖子ID[_媒体ID].扩展名（"# " 前缀表示已跳过）
+_LINE_RE = re.compile(r'^(?:# )?((\d+)(?:_\d+)?)\.(jpg|mp4|webp)$', re.IGNORECASE)
+
+# 快拍媒体文件扩展名（含大小写两种写法，直接用于 str.endswith）
+_MEDIA_EXTS = ('.jpg', '.mp4', '.webp', '.JPG', '.MP4', '.WEBP')
+
+# 元数据文件扩展名
+_JSON_EXTS = ('.json', '.JSON')
+
+# 帖子内容中的标签 (#tag)
+_HASHTAG_RE = re.compile(r'#(\w+)')
+
+# Instagram 用户名（只允许字母、数字、下划线、点）
+_USERNAME_RE = re.compile(r'\A[a-zA-Z0-9_.]+\Z')
+
+# 快拍链接中的用户名: /stories/username/id/
+_STORY_URL_RE = re.compile(r'/stories/([^/]+)/')
+
+# 有效的 Instagram Cookie 行: 行首（允许前导空白）以 .instagram.com 开头，用于小写后的整段内容
+_COOKIE_LINE_RE = re.compile(r'^[^\S\n]*\.instagram\.com', re.MULTILINE)
+
+# 每个账号已下载帖子的post_id集合缓存: {账号: (post_id集合, 生成时的存档条目数)}
+_POST_ID_INDEX = {}
+
+
+def extract_post_ids(downloaded_ids):
+    """从已下载的完整ID（含扩展名）中提取post_id集合（用于帖子级别的重复检测）"""
+    post_ids = set()
+    for full_id in downloaded_ids:
+        # 去掉扩展名，提取post_id（下划线前部分）
+        id_without_ext = full_id.rsplit('.', 1)[0] if '.' in full_id else full_id
+        post_ids.add(id_without_ext.split('_')[0])
+    return frozenset(post_ids)
+
+
+def get_downloaded_post_ids(account, downloaded_ids):
+    """
+    获取账号已下载帖子的post_id集合，存档条目数未变化时直接复用缓存
+    
+    Args:
+        account: 账号名
+        downloaded_ids: 已下载的完整ID集合（含扩展名）
+    
+    Returns:
+        frozenset: post_id集合
+    """
+    cached = _POST_ID_INDEX.get(account)
+    if cached is not None and cached[1] == len(downloaded_ids):
+        return cached[0]
+    post_ids = extract_post_ids(downloaded_ids)
+    _POST_ID_INDEX[account] = (post_ids, len(downloaded_ids))
+    return post_ids
+
+
+def run_gallery_dl_scan_posts(url, downloaded_ids, max_range, output, downloaded_post_ids=None):
+    """
+    解析帖子（Posts）扫描输出，遇到连续重复则停止，或达到最大范围停止
+    
+    gallery-dl 由 scan_accounts_batch 批量运行（连续重复时在批量读取中提前终止），这里只解析其输出
+    
+    Args:
+        url: 账号URL
+        downloaded_ids: 已下载的完整ID集合（含扩展名）
+        max_range: 最大扫描范围（媒体文件数量），None表示不限制
+        output: 批量扫描得到的该账号 (输出行列表, 返回码)
+        downloaded_post_ids: 预先计算好的post_id集合，None 表示从 downloaded_ids 提取
     
-    cmd.append(url)
+    Returns:
+        (media_list, success, stopped_early): 媒体信息列表、是否成功、是否提前终止
+    """
+    if downloaded_post_ids is None:
+        downloaded_post_ids = extract_post_ids(downloaded_ids)
     
     print(f"  [扫描帖子] {url}")
     
     try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            encoding='utf-8',
-            errors='ignore',
-            timeout=120  # 增加超时时间到120秒
-        )
+        lines, returncode = output
+        if returncode is None:
+            # 批量扫描本身失败
+            return [], False, False
         
         # 解析输出，提取媒体文件ID，并检测连续重复
         media_list = []
@@ -310,23 +781,21 @@ def run_gallery_dl_scan_posts(url, downloaded_ids, max_range=None):
         max_duplicates = config.MAX_CONSECUTIVE_DUPLICATES  # 从配置读取重复检测阈值
         stopped_early = False
         new_content_count = 0  # 新内容计数器
+        unique_new_posts = 0  # 新帖子计数器
+        max_media_index = 0  # 新内容的最大媒体位置
         last_post_id = None  # 记录上一个帖子的ID
         post_index = 0  # 帖子位置索引（从1开始）
         media_index = 0  # 媒体文件全局位置索引（从1开始，用于range参数）
         
-        for line in result.stdout.split('\n'):
-            line = line.strip().upper()
-            if line.startswith('# '):
-                line = line[2:]
-            if line and any(ext in line.lower() for ext in ['.jpg', '.mp4', '.webp']):
-                # 使用完整文件名（含扩展名）进行重复检测
-                filename = line
-                # 提取帖子ID（下划线前部分），用于判断是否是同一帖子
-                full_id = line.rsplit('.', 1)[0]
-                post_id = full_id.split('_')[0]
-                # 提取扩展名判断类型
-                ext = line.rsplit('.', 1)[1].lower() if '.' in line else ''
-                media_type = '视频' if ext == 'mp4' else '图片'
+        for line in lines:
+            m = _LINE_RE.match(line.strip())
+            if m:
+                # full_id 为去掉扩展名的文件名，post_id 为下划线前部分（用于判断是否是同一帖子）
+                full_id, post_id, ext = m.groups()
+                ext = ext.upper()
+                # 使用完整文件名（含扩展名，扩展名大写与存档格式一致）进行重复检测
+                filename = f"{full_id}.{ext}"
+                media_type = '视频' if ext == 'MP4' else '图片'
                 
                 # 检查是否是新帖子（前缀不同）
                 is_new_post = (post_id != last_post_id)
@@ -359,6 +828,10 @@ def run_gallery_dl_scan_posts(url, downloaded_ids, max_range=None):
                     else:
                         print(f"     ✨ 帖子 {post_id} ({media_type}, 同一帖子的媒体, 媒体位置{media_index})")
                     
+                    if is_new_post:
+                        unique_new_posts += 1
+                    max_media_index = media_index
+                    
                     # 记录完整信息到媒体列表
                     media_list.append({
                         "id": full_id,
@@ -376,72 +849,55 @@ def run_gallery_dl_scan_posts(url, downloaded_ids, max_range=None):
                         stopped_early = True
                         break
         
-        unique_new_posts = len(set(m["post_id"] for m in media_list))
-        max_media_index = max((m["media_index"] for m in media_list), default=0) if media_list else 0
         total_scanned = new_content_count + duplicate_count
         if stopped_early:
             print(f"     📊 扫描统计: 发现 {new_content_count} 个新内容 ({unique_new_posts} 个帖子, 最大媒体位置{max_media_index})，{duplicate_count} 个重复后停止")
         else:
             print(f"     📊 扫描统计: 发现 {new_content_count} 个新内容 ({unique_new_posts} 个帖子, 最大媒体位置{max_media_index})，{duplicate_count} 个重复")
         
-        # 判断成功：只要有媒体文件返回就认为成功（即使gallery-dl返回非零退出码）
-        success = len(media_list) > 0 or result.returncode == 0
+        # 判断成功：只要有媒体文件返回或主动提前终止就认为成功（即使gallery-dl返回非零退出码）
+        success = len(media_list) > 0 or returncode == 0 or stopped_early
         return media_list, success, stopped_early
         
-    except subprocess.TimeoutExpired:
-        print(f"  [错误] 帖子扫描超时")
-        return [], False, False
     except Exception as e:
         print(f"  [错误] {e}")
         return [], False, False
 
 
-def run_gallery_dl_scan_stories(url, downloaded_ids):
+def run_gallery_dl_scan_stories(url, downloaded_ids, output):
     """
-    扫描快拍（Stories），全部扫描（快拍数量少，且顺序不确定）
+    解析快拍（Stories）扫描输出，全部扫描（快拍数量少，且顺序不确定）
     
     Args:
         url: 账号URL
         downloaded_ids: 已下载的快拍ID集合
+        output: 批量扫描得到的该账号 (输出行列表, 返回码)
     
     Returns:
         (media_list, success): 媒体信息列表、是否成功
     """
-    cmd = [
-        get_gallery_dl_path(),
-        "--simulate",
-        "--proxy", config.PROXY,
-        "--cookies", config.COOKIES_FILE,
-        "-o", "extractor.instagram.include=stories",
-        url
-    ]
-    
     print(f"  [扫描快拍] {url}")
     
     try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            encoding='utf-8',
-            errors='ignore',
-            timeout=60
-        )
+        lines, returncode = output
+        if returncode is None:
+            # 批量扫描本身失败
+            return [], False
         
         # 解析输出，提取媒体文件ID（全部扫描，不提前终止）
         media_list = []
         total_scanned = 0
         
-        for line in result.stdout.split('\n'):
-            line = line.strip().upper()
+        for line in lines:
+            line = line.strip()
             if line.startswith('# '):
                 line = line[2:]
-            if line and any(ext in line.lower() for ext in ['.jpg', '.mp4', '.webp']):
-                filename = line
-                media_id = line.rsplit('.', 1)[0]
-                # 提取扩展名判断类型
-                ext = line.rsplit('.', 1)[1].lower() if '.' in line else ''
-                media_type = '视频' if ext == 'mp4' else '图片'
+            if line.endswith(_MEDIA_EXTS):
+                media_id, ext = line.rsplit('.', 1)
+                ext = ext.upper()
+                # 完整文件名（扩展名大写与存档格式一致）
+                filename = f"{media_id}.{ext}"
+                media_type = '视频' if ext == 'MP4' else '图片'
                 
                 if media_id.replace('_', '').isdigit():
                     total_scanned += 1
@@ -460,23 +916,26 @@ def run_gallery_dl_scan_stories(url, downloaded_ids):
         
         print(f"     📊 扫描统计: 发现 {len(media_list)} 个新内容，共 {total_scanned} 个")
         
-        return media_list, result.returncode == 0
+        return media_list, returncode == 0
         
-    except subprocess.TimeoutExpired:
-        print(f"  [错误] 快拍扫描超时")
-        return [], False
     except Exception as e:
         print(f"  [错误] {e}")
         return [], False
 
 
-def check_account(account, archive, max_range=None):
+def count_unique_posts(new_posts):
+    """统计媒体列表中的唯一帖子数量（同一帖子的多个媒体只算一次）"""
+    return len({m.get("post_id") or m["id"].split('_', 1)[0] for m in new_posts})
+
+
+def check_account(account, archive, max_range=None, prefetched=None):
     """检查账号的新内容（帖子和快拍分别统计，支持提前终止和范围限制）
     
     Args:
         account: 账号名
         archive: 存档数据
         max_range: 最大扫描范围（媒体文件数量），None表示不限制
+        prefetched: scan_accounts_batch 返回的该账号扫描输出，None 表示单独并发扫描该账号
     """
     url = f"https://www.instagram.com/{account}/"
     
@@ -484,6 +943,10 @@ def check_account(account, archive, max_range=None):
     print(f"📱 账号: {account}")
     print(f"{'='*60}")
     
+    # 单独检查时也并发扫描帖子和快拍
+    if prefetched is None:
+        prefetched = scan_accounts_batch([account], max_range, archive)[account]
+    
     # 获取已下载的ID（完整文件名含扩展名）
     downloaded_posts = set(archive.get(account, {}).get("posts", []))
     downloaded_stories = set(archive.get(account, {}).get("stories", []))
@@ -492,17 +955,20 @@ def check_account(account, archive, max_range=None):
     print()
     if max_range:
         print(f"  [扫描范围] 最多扫描前 {max_range} 个媒体文件")
-    posts_list, posts_success, posts_stopped = run_gallery_dl_scan_posts(url, downloaded_posts, max_range)
+    posts_output = prefetched["posts"]
+    downloaded_post_ids = get_downloaded_post_ids(account, downloaded_posts)
+    posts_list, posts_success, posts_stopped = run_gallery_dl_scan_posts(
+        url, downloaded_posts, max_range, posts_output, downloaded_post_ids
+    )
     
     if posts_success:
         new_posts = posts_list  # 扫描函数已经过滤了重复
-        # 计算唯一帖子数量和帖子位置范围
-        unique_post_ids = set(m.get("post_id", m["id"].split('_')[0]) for m in new_posts)
-        post_indices = [m.get("post_index", 0) for m in new_posts]
-        min_post_idx = min(post_indices) if post_indices else 0
-        max_post_idx = max(post_indices) if post_indices else 0
-        post_range_str = f"帖子位置{min_post_idx}-{max_post_idx}" if len(unique_post_ids) > 1 else f"帖子位置{min_post_idx}"
-        print(f"  📊 帖子: 发现 {len(unique_post_ids)} 个新帖子 ({len(new_posts)} 个媒体文件, {post_range_str})", end="")
+        # 计算唯一帖子数量和帖子位置范围（扫描结果按帖子位置递增排列）
+        unique_post_count = count_unique_posts(new_posts)
+        min_post_idx = new_posts[0].get("post_index", 0) if new_posts else 0
+        max_post_idx = new_posts[-1].get("post_index", 0) if new_posts else 0
+        post_range_str = f"帖子位置{min_post_idx}-{max_post_idx}" if unique_post_count > 1 else f"帖子位置{min_post_idx}"
+        print(f"  📊 帖子: 发现 {unique_post_count} 个新帖子 ({len(new_posts)} 个媒体文件, {post_range_str})", end="")
         if posts_stopped:
             print(" (已提前终止)")
         else:
@@ -514,15 +980,12 @@ def check_account(account, archive, max_range=None):
     else:
         print(f"  ❌ 帖子扫描失败")
         new_posts = []
-    
-    # 请求间隔休眠
-    if hasattr(__builtins__, 'REQUEST_SLEEP') and REQUEST_SLEEP[1] > 0:
-        sleep_time = random.randint(REQUEST_SLEEP[0], REQUEST_SLEEP[1])
-        sleep_with_progress_bar(sleep_time, "请求间隔")
+        unique_post_count = 0
     
     # 扫描快拍
     print()
-    stories_list, stories_success = run_gallery_dl_scan_stories(url, downloaded_stories)
+    stories_output = prefetched["stories"]
+    stories_list, stories_success = run_gallery_dl_scan_stories(url, downloaded_stories, stories_output)
     
     if stories_success:
         new_stories = stories_list  # 扫描函数已经过滤了重复
@@ -538,9 +1001,6 @@ def check_account(account, archive, max_range=None):
     # 合并新内容
     all_new = new_posts + new_stories
     
-    # 计算唯一帖子数量（使用post_id去重）
-    unique_post_count = len(set(m.get("post_id", m["id"].split('_')[0]) for m in new_posts))
-    
     print(f"\n{'='*60}")
     print(f"📊 汇总: {len(all_new)} 个新内容")
     print(f"   - 帖子: {unique_post_count} 个帖子 ({len(new_posts)} 个媒体文件) {'(提前终止)' if posts_stopped else ''}")
@@ -550,27 +1010,40 @@ def check_account(account, archive, max_range=None):
     return all_new, new_posts, new_stories
 
 
-def update_archive(account, new_posts, new_stories):
-    """更新存档记录（帖子和快拍分开存储，使用完整ID含扩展名）"""
-    archive = load_archive()
+def update_archive(account, new_posts, new_stories, archive=None):
+    """
+    更新存档记录（帖子和快拍分开存储，使用完整ID含扩展名）
     
-    if account not in archive:
-        archive[account] = {"posts": [], "stories": []}
+    新增记录以一行 JSON 追加到存档日志，不重写整个存档文件
     
-    # 添加新帖子ID（使用完整文件名含扩展名）
-    new_post_ids = [m["filename"] for m in new_posts]
-    archive[account]["posts"].extend(new_post_ids)
-    archive[account]["posts"] = list(dict.fromkeys(archive[account]["posts"]))
+    Args:
+        account: 账号名
+        new_posts: 新帖子媒体列表
+        new_stories: 新快拍媒体列表
+        archive: 调用方已加载的存档（会同步更新），None 表示从文件加载
+    """
+    if archive is None:
+        archive = load_archive()
     
-    # 添加新快拍ID（使用完整文件名含扩展名）
+    # 使用完整文件名含扩展名
+    new_post_ids = [m["filename"] for m in new_posts]
     new_story_ids = [m["filename"] for m in new_stories]
-    archive[account]["stories"].extend(new_story_ids)
-    archive[account]["stories"] = list(dict.fromkeys(archive[account]["stories"]))
+    entry = merge_archive_entry(archive, account, new_post_ids, new_story_ids)
+    
+    log_path = get_archive_log_path()
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    record = {"account": account, "add_posts": new_post_ids, "add_stories": new_story_ids}
+    with open(log_path, 'ab') as f:
+        f.write(json.dumps(record, ensure_ascii=False).encode('utf-8') + b'\n')
+    
+    # 日志过大时合并回存档文件
+    if log_path.stat().st_size > ARCHIVE_LOG_MAX_SIZE:
+        save_archive(archive)
     
-    save_archive(archive)
+    _POST_ID_INDEX.pop(account, None)
     print(f"\n  💾 已更新存档:")
-    print(f"     帖子: {len(archive[account]['posts'])} 个媒体文件")
-    print(f"     快拍: {len(archive[account]['stories'])} 个媒体文件")
+    print(f"     帖子: {len(entry['posts'])} 个媒体文件")
+    print(f"     快拍: {len(entry['stories'])} 个媒体文件")
 
 
 def sleep_with_progress_bar(total_seconds, label="等待"):
@@ -581,43 +1054,101 @@ def sleep_with_progress_bar(total_seconds, label="等待"):
         total_seconds: 总等待秒数
         label: 显示的标签文字
     """
-    import sys
-    
     bar_length = 30  # 进度条长度
     
-    for i in range(total_seconds + 1):
-        # 计算进度
+    def draw(i):
+        # 计算进度并构建进度条
         progress = i / total_seconds if total_seconds > 0 else 1
         filled = int(bar_length * progress)
-        empty = bar_length - filled
-        
-        # 构建进度条
-        bar = "█" * filled + "░" * empty
-        
-        # 显示进度
+        bar = "█" * filled + "░" * (bar_length - filled)
         sys.stdout.write(f"\r  ⏱️  {label}: [{bar}] {i}/{total_seconds} 秒")
         sys.stdout.flush()
-        
-        # 最后一秒不sleep
-        if i < total_seconds:
-            time.sleep(1)
+    
+    # 按单调时钟的截止时间等待，避免每秒绘制的耗时累积成偏差
+    deadline = time.monotonic() + total_seconds
+    shown = 0
+    draw(shown)
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        time.sleep(min(0.5, remaining))
+        # 只在整秒数变化时重绘
+        elapsed = min(total_seconds, int(total_seconds - max(0.0, deadline - time.monotonic())))
+        if elapsed != shown:
+            shown = elapsed
+            draw(shown)
+    if shown != total_seconds:
+        draw(total_seconds)
     
     # 换行
     sys.stdout.write("\n")
     sys.stdout.flush()
 
 
-def extract_and_save_post_info_from_paths(account, json_file_paths):
+def sleep_in_range(sleep_range, label):
+    """
+    按休眠范围随机休眠（显示进度条）
+    
+    Args:
+        sleep_range: (最小秒数, 最大秒数) 或 "最小值-最大值" 设置字符串，如 config.REQUEST_SLEEP / config.DOWNLOAD_SLEEP；
+                     统一经 config.parse_sleep_range 规范化，最大值为 0 或格式无效表示不休眠
+        label: 显示的标签文字
+    """
+    range_min, range_max = config.parse_sleep_range(sleep_range)
+    if range_max > 0:
+        sleep_with_progress_bar(random.randint(range_min, range_max), label)
+
+
+# 嵌套字段缺失时使用的只读空字典（不会被修改，可安全共享）
+_EMPTY_DICT = {}
+
+# 帖子信息TXT的分隔线（宽度68，预先生成避免每次重复拼接）
+_RULE_LINE = f"{'=' * 68}\n"
+_THIN_LINE = f"{'-' * 68}\n"
+_BOX_TOP = f"╔{'═' * 68}╗\n"
+_BOX_MID = f"╠{'═' * 68}╣\n"
+_BOX_BOT = f"╚{'═' * 68}╝\n"
+_CARD_TOP = f"┌{'─' * 68}┐\n"
+_CARD_MID = f"├{'─' * 68}┤\n"
+_CARD_BOT = f"└{'─' * 68}┘\n"
+# 方框内固定文字后的补齐空格
+_PAD = {n: ' ' * n for n in (56, 57)}
+
+# 并行解析元数据JSON文件的线程池（线程按需创建，多次调用复用）
+_JSON_POOL = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1))
+
+
+# 不小于该大小（字节）的元数据文件通过 mmap 直接交给 orjson 解析（省去一次完整复制）
+_MMAP_MIN_SIZE = 4096
+
+
+def _load_json_file(path):
+    """读取并解析单个JSON文件（大文件在 orjson 可用时使用 mmap）"""
+    with open(path, 'rb') as f:
+        if config.HAS_ORJSON and os.fstat(f.fileno()).st_size >= _MMAP_MIN_SIZE:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+                return config.loads(view)
+        return config.loads(f.read())
+
+
+def _parse_json_file(path):
+    """读取并解析单个JSON文件，失败时返回异常对象（由调用方按顺序报告）"""
+    try:
+        return _load_json_file(path)
+    except Exception as e:
+        return e
+
+
+def extract_and_save_post_info_from_paths(account, json_file_paths, preparsed=None):
     """
     从元数据JSON文件（完整路径）中提取帖子信息并保存到TXT
     
     Args:
         account: 账号名
         json_file_paths: JSON文件的完整路径列表
+        preparsed: 可选，{完整路径: 已解析的数据} 字典，命中的文件不再重复读取解析
     """
-    import json
-    import re
-    from pathlib import Path
     
     def extract_caption(data):
         """提取帖子文字内容"""
@@ -627,16 +1158,15 @@ def extract_and_save_post_info_from_paths(account, json_file_paths):
         if not caption and 'edge_media_to_caption' in data:
             edges = data['edge_media_to_caption'].get('edges', [])
             if edges:
-                caption = edges[0].get('node', {}).get('text', '')
+                caption = (edges[0].get('node') or _EMPTY_DICT).get('text', '')
         return caption or '无'
     
-    def extract_hashtags(data):
-        """提取标签"""
+    def extract_hashtags(data, caption):
+        """提取标签（caption 为已提取的帖子文字，避免重复提取）"""
         tags = data.get('tags', [])
         if tags:
             return tags
-        caption = extract_caption(data)
-        return re.findall(r'#(\w+)', caption)
+        return _HASHTAG_RE.findall(caption)
     
     def extract_tagged_users(data):
         """提取提及的用户"""
@@ -658,7 +1188,7 @@ def extract_and_save_post_info_from_paths(account, json_file_paths):
         location_slug = data.get('location_slug', '')
         if location_slug:
             return location_slug
-        location = data.get('location', {})
+        location = data.get('location')
         if isinstance(location, dict):
             name = location.get('name', '')
             slug = location.get('slug', '')
@@ -679,40 +1209,48 @@ def extract_and_save_post_info_from_paths(account, json_file_paths):
                 dt = datetime.fromtimestamp(timestamp)
                 return dt.strftime('%Y-%m-%d %H:%M:%S')
             return str(timestamp)
-        except:
+        except (TypeError, ValueError, OSError, OverflowError):
             return str(timestamp)
     
-    # 提取所有JSON文件的信息
+    # 提取所有JSON文件的信息（多线程并行读取和解析，按原顺序处理结果）
+    # 循环内每条记录只绑定一次 data.get
     info_list = []
-    for json_path_str in json_file_paths:
+    preparsed = preparsed or {}
+    
+    def parse(path):
+        # 已预先解析的文件直接使用结果，其余再读取解析
+        return preparsed.get(path) or _parse_json_file(path)
+    
+    for json_path_str, data in zip(json_file_paths, _JSON_POOL.map(parse, json_file_paths)):
         try:
             json_path = Path(json_path_str)
-            if not json_path.exists():
+            if isinstance(data, FileNotFoundError):
                 print(f"     ⚠️  文件不存在: {json_path}")
                 continue
-            
-            with open(json_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            if isinstance(data, Exception):
+                raise data
             
             caption = extract_caption(data)
-            hashtags = extract_hashtags(data)
+            hashtags = extract_hashtags(data, caption)
             mentions = extract_tagged_users(data)
             location = extract_location(data)
+            get = data.get
+            owner = get('owner') or _EMPTY_DICT
             
             info = {
                 'file': json_path.name,
-                'username': data.get('username', '') or data.get('owner', {}).get('username', account),
-                'fullname': data.get('fullname', '') or data.get('owner', {}).get('full_name', ''),
+                'username': get('username', '') or owner.get('username', account),
+                'fullname': get('fullname', '') or owner.get('full_name', ''),
                 'timestamp': format_timestamp(data),
                 'caption': caption,
                 'hashtags': hashtags,
                 'mentions': mentions,
                 'location': location,
-                'likes': data.get('likes', 0),
-                'comments': data.get('comments', 0),
-                'media_type': '视频' if data.get('is_video') or data.get('video_url') else '图片',
-                'shortcode': data.get('shortcode', '') or data.get('post_shortcode', ''),
-                'post_url': data.get('post_url', '')
+                'likes': get('likes', 0),
+                'comments': get('comments', 0),
+                'media_type': '视频' if get('is_video') or get('video_url') else '图片',
+                'shortcode': get('shortcode', '') or get('post_shortcode', ''),
+                'post_url': get('post_url', '')
             }
             info_list.append(info)
             print(f"     ✅ 解析成功: {json_path.name}")
@@ -732,43 +1270,48 @@ def extract_and_save_post_info_from_paths(account, json_file_paths):
     
     output_file.parent.mkdir(parents=True, exist_ok=True)
     
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(f"{'='*68}\n")
-        f.write(f"{'Instagram 帖子信息汇总':^68}\n")
-        f.write(f"{'账号: ' + account:^68}\n")
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        f.write(f"{'生成时间: ' + current_time:^68}\n")
-        f.write(f"{'-'*68}\n")
-        f.write(f"共 {len(info_list)} 个帖子\n")
-        f.write(f"{'='*68}\n\n")
-        
-        for i, info in enumerate(info_list, 1):
-            f.write(f"{'-'*68}\n")
-            f.write(f"【帖子 {i}】\n")
-            f.write(f"{'-'*68}\n")
-            f.write(f"📄 文件: {info['file']}\n")
-            f.write(f"👤 发帖人: {info['fullname'] or info['username']}\n")
-            f.write(f"📝 用户名: @{info['username']}\n")
-            f.write(f"⏰ 发布时间: {info['timestamp']}\n")
-            f.write(f"📍 地理位置: {info['location']}\n")
-            f.write(f"{'-'*68}\n")
-            f.write(f"💬 帖子内容:\n")
-            caption_lines = info['caption'].split('\n')
-            for line in caption_lines:
-                while line:
-                    display_line = line[:68]
-                    f.write(f"{display_line}\n")
-                    line = line[68:]
-            f.write(f"{'-'*68}\n")
-            f.write(f"🏷️  标签: {', '.join(['#' + h for h in info['hashtags']]) if info['hashtags'] else '无'}\n")
-            f.write(f"👥 提及: {', '.join(['@' + m.split(' ')[0] for m in info['mentions']]) if info['mentions'] else '无'}\n")
-            f.write(f"{'-'*68}\n")
-            f.write(f"❤️  点赞: {info['likes']}\n")
-            f.write(f"💬 评论: {info['comments']}\n")
-            f.write(f"📎 类型: {info['media_type']}\n")
-            post_link = info['post_url'] or f"https://instagram.com/p/{info['shortcode']}/"
-            f.write(f"🔗 链接: {post_link}\n")
-            f.write(f"{'-'*68}\n\n")
+    # 先在内存中拼接全部内容，最后整体编码一次并写入文件
+    parts = []
+    w = parts.append
+    w(_RULE_LINE)
+    w(f"{'Instagram 帖子信息汇总':^68}\n")
+    w(f"{'账号: ' + account:^68}\n")
+    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    w(f"{'生成时间: ' + current_time:^68}\n")
+    w(_THIN_LINE)
+    w(f"共 {len(info_list)} 个帖子\n")
+    w(_RULE_LINE + "\n")
+    
+    for i, info in enumerate(info_list, 1):
+        w(_THIN_LINE)
+        w(f"【帖子 {i}】\n")
+        w(_THIN_LINE)
+        w(f"📄 文件: {info['file']}\n")
+        w(f"👤 发帖人: {info['fullname'] or info['username']}\n")
+        w(f"📝 用户名: @{info['username']}\n")
+        w(f"⏰ 发布时间: {info['timestamp']}\n")
+        w(f"📍 地理位置: {info['location']}\n")
+        w(_THIN_LINE)
+        w(f"💬 帖子内容:\n")
+        for line in info['caption'].split('\n'):
+            if len(line) <= 68:
+                # 大多数行不需要折行，直接写入（空行跳过，与原行为一致）
+                if line:
+                    w(f"{line}\n")
+            else:
+                parts.extend(f"{line[start:start + 68]}\n" for start in range(0, len(line), 68))
+        w(_THIN_LINE)
+        w(f"🏷️  标签: {', '.join('#' + h for h in info['hashtags']) or '无'}\n")
+        w(f"👥 提及: {', '.join('@' + m.partition(' ')[0] for m in info['mentions']) or '无'}\n")
+        w(_THIN_LINE)
+        w(f"❤️  点赞: {info['likes']}\n")
+        w(f"💬 评论: {info['comments']}\n")
+        w(f"📎 类型: {info['media_type']}\n")
+        post_link = info['post_url'] or f"https://instagram.com/p/{info['shortcode']}/"
+        w(f"🔗 链接: {post_link}\n")
+        w(_THIN_LINE + "\n")
+    
+    output_file.write_bytes("".join(parts).encode('utf-8'))
     
     print(f"     📝 已保存帖子信息: {output_file}")
 
@@ -782,9 +1325,6 @@ def extract_and_save_post_info(account, json_files, subdir='posts'):
         json_files: JSON文件名列表（不含路径）
         subdir: 子目录名称（默认为 'posts'）
     """
-    import json
-    import re
-    from pathlib import Path
     
     def extract_caption(data):
         """提取帖子文字内容"""
@@ -795,18 +1335,17 @@ def extract_and_save_post_info(account, json_files, subdir='posts'):
         if not caption and 'edge_media_to_caption' in data:
             edges = data['edge_media_to_caption'].get('edges', [])
             if edges:
-                caption = edges[0].get('node', {}).get('text', '')
+                caption = (edges[0].get('node') or _EMPTY_DICT).get('text', '')
         return caption or '无'
     
-    def extract_hashtags(data):
-        """提取标签"""
+    def extract_hashtags(data, caption):
+        """提取标签（caption 为已提取的帖子文字，避免重复提取）"""
         # 优先使用 tags 字段（gallery-dl 提取的）
         tags = data.get('tags', [])
         if tags:
             return tags
-        # 从文字中提取
-        caption = extract_caption(data)
-        return re.findall(r'#(\w+)', caption)
+        # 从已提取的文字中提取
+        return _HASHTAG_RE.findall(caption)
     
     def extract_tagged_users(data):
         """提取提及的用户"""
@@ -830,7 +1369,7 @@ def extract_and_save_post_info(account, json_files, subdir='posts'):
         if location_slug:
             return location_slug
         # 使用 location 字段
-        location = data.get('location', {})
+        location = data.get('location')
         if isinstance(location, dict):
             name = location.get('name', '')
             slug = location.get('slug', '')
@@ -852,59 +1391,69 @@ def extract_and_save_post_info(account, json_files, subdir='posts'):
                 dt = datetime.fromtimestamp(timestamp)
                 return dt.strftime('%Y-%m-%d %H:%M:%S')
             return str(timestamp)
-        except:
+        except (TypeError, ValueError, OSError, OverflowError):
             return str(timestamp)
     
     # 获取数据目录
     data_dir = config.get_data_dir()
+    account_dir = data_dir / config.DOWNLOAD_DIR / account
+    # 候选目录（如果 subdir 为空，则直接放在账号目录下；找不到时尝试其他可能的目录）
+    primary_dir = account_dir / subdir if subdir else account_dir
+    candidate_dirs = list(dict.fromkeys([
+        primary_dir,
+        account_dir / 'posts',
+        account_dir / 'manual',
+        data_dir / config.DOWNLOAD_DIR / 'temp_manual',
+    ]))
+    # 每个候选目录只 scandir 一次，之后用文件名集合判断文件在哪个目录
+    dir_listings = []
+    for directory in candidate_dirs:
+        try:
+            with os.scandir(directory) as it:
+                dir_listings.append((directory, {entry.name for entry in it}))
+        except OSError:
+            continue
     
-    # 提取所有JSON文件的信息
+    def locate_and_parse(json_file):
+        """在候选目录中查找并解析JSON文件，返回 (路径, 数据或异常对象)"""
+        for directory, names in dir_listings:
+            if json_file in names:
+                json_path = directory / json_file
+                return json_path, _parse_json_file(json_path)
+        return primary_dir / json_file, FileNotFoundError(json_file)
+    
+    # 提取所有JSON文件的信息（多线程并行查找和解析，按原顺序处理结果）
+    # 循环内每条记录只绑定一次 data.get
     info_list = []
-    for json_file in json_files:
+    for json_file, (json_path, data) in zip(json_files, _JSON_POOL.map(locate_and_parse, json_files)):
         try:
-            # 构建路径（如果 subdir 为空，则直接放在账号目录下）
-            if subdir:
-                json_path = data_dir / config.DOWNLOAD_DIR / account / subdir / json_file
-            else:
-                json_path = data_dir / config.DOWNLOAD_DIR / account / json_file
-            
-            if not json_path.exists():
-                # 如果找不到，尝试其他可能的目录
-                alt_paths = [
-                    data_dir / config.DOWNLOAD_DIR / account / 'posts' / json_file,
-                    data_dir / config.DOWNLOAD_DIR / account / 'manual' / json_file,
-                    data_dir / config.DOWNLOAD_DIR / 'temp_manual' / json_file,
-                ]
-                for alt_path in alt_paths:
-                    if alt_path.exists():
-                        json_path = alt_path
-                        break
-                else:
-                    print(f"     ⚠️  文件不存在: {json_path}")
-                    continue
-            
-            with open(json_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            if isinstance(data, FileNotFoundError):
+                print(f"     ⚠️  文件不存在: {json_path}")
+                continue
+            if isinstance(data, Exception):
+                raise data
             
             caption = extract_caption(data)
-            hashtags = extract_hashtags(data)
+            hashtags = extract_hashtags(data, caption)
             mentions = extract_tagged_users(data)
             location = extract_location(data)
+            get = data.get
+            owner = get('owner') or _EMPTY_DICT
             
             info = {
                 'file': json_file,
-                'username': data.get('username', '') or data.get('owner', {}).get('username', account),
-                'fullname': data.get('fullname', '') or data.get('owner', {}).get('full_name', ''),
+                'username': get('username', '') or owner.get('username', account),
+                'fullname': get('fullname', '') or owner.get('full_name', ''),
                 'timestamp': format_timestamp(data),
                 'caption': caption,
                 'hashtags': hashtags,
                 'mentions': mentions,
                 'location': location,
-                'likes': data.get('likes', 0),
-                'comments': data.get('comments', 0),
-                'media_type': '视频' if data.get('is_video') or data.get('video_url') else '图片',
-                'shortcode': data.get('shortcode', '') or data.get('post_shortcode', ''),
-                'post_url': data.get('post_url', '')
+                'likes': get('likes', 0),
+                'comments': get('comments', 0),
+                'media_type': '视频' if get('is_video') or get('video_url') else '图片',
+                'shortcode': get('shortcode', '') or get('post_shortcode', ''),
+                'post_url': get('post_url', '')
             }
             info_list.append(info)
             print(f"     ✅ 解析成功: {json_file}")
@@ -922,45 +1471,49 @@ def extract_and_save_post_info(account, json_files, subdir='posts'):
         output_file = data_dir / config.DOWNLOAD_DIR / account / '帖子信息.txt'
     output_file.parent.mkdir(parents=True, exist_ok=True)
     
-    with open(output_file, 'w', encoding='utf-8') as f:
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        f.write(f"╔{'═'*68}╗\n")
-        f.write(f"║{'Instagram 帖子信息汇总':^68}║\n")
-        f.write(f"║{f'账号: {account}':^68}║\n")
-        f.write(f"║{f'生成时间: {current_time}':^68}║\n")
-        f.write(f"╠{'═'*68}╣\n")
-        f.write(f"║  共 {len(info_list)} 个帖子{' '*56}║\n")
-        f.write(f"╚{'═'*68}╝\n\n")
-        
-        for i, info in enumerate(info_list, 1):
-            f.write(f"┌{'─'*68}┐\n")
-            f.write(f"│ 【帖子 {i}】{' '*57}│\n")
-            f.write(f"├{'─'*68}┤\n")
-            f.write(f"│ 📄 文件: {info['file']:<57}│\n")
-            f.write(f"│ 👤 发帖人: {info['fullname'] or info['username']:<55}│\n")
-            f.write(f"│ 📝 用户名: @{info['username']:<54}│\n")
-            f.write(f"│ ⏰ 发布时间: {info['timestamp']:<53}│\n")
-            f.write(f"│ 📍 地理位置: {info['location']:<53}│\n")
-            f.write(f"├{'─'*68}┤\n")
-            f.write(f"│ 💬 帖子内容:\n")
-            # 处理多行内容
-            caption_lines = info['caption'].split('\n')
-            for line in caption_lines:
-                # 每行最多显示 64 个字符
-                while line:
-                    display_line = line[:64]
-                    f.write(f"│    {display_line:<64}│\n")
-                    line = line[64:]
-            f.write(f"├{'─'*68}┤\n")
-            f.write(f"│ 🏷️  标签: {', '.join(['#' + h for h in info['hashtags']]) if info['hashtags'] else '无':<54}│\n")
-            f.write(f"│ 👥 提及: {', '.join(['@' + m.split(' ')[0] for m in info['mentions']]) if info['mentions'] else '无':<55}│\n")
-            f.write(f"├{'─'*68}┤\n")
-            f.write(f"│ ❤️  点赞: {info['likes']:<54}│\n")
-            f.write(f"│ 💬 评论: {info['comments']:<55}│\n")
-            f.write(f"│ 📎 类型: {info['media_type']:<55}│\n")
-            post_link = info['post_url'] or f"https://instagram.com/p/{info['shortcode']}/"
-            f.write(f"│ 🔗 链接: {post_link:<55}│\n")
-            f.write(f"└{'─'*68}┘\n\n")
+    # 先在内存中拼接全部内容，最后整体编码一次并写入文件
+    parts = []
+    w = parts.append
+    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    w(_BOX_TOP)
+    w(f"║{'Instagram 帖子信息汇总':^68}║\n")
+    w(f"║{f'账号: {account}':^68}║\n")
+    w(f"║{f'生成时间: {current_time}':^68}║\n")
+    w(_BOX_MID)
+    w(f"║  共 {len(info_list)} 个帖子{_PAD[56]}║\n")
+    w(_BOX_BOT + "\n")
+    
+    for i, info in enumerate(info_list, 1):
+        w(_CARD_TOP)
+        w(f"│ 【帖子 {i}】{_PAD[57]}│\n")
+        w(_CARD_MID)
+        w(f"│ 📄 文件: {info['file']:<57}│\n")
+        w(f"│ 👤 发帖人: {info['fullname'] or info['username']:<55}│\n")
+        w(f"│ 📝 用户名: @{info['username']:<54}│\n")
+        w(f"│ ⏰ 发布时间: {info['timestamp']:<53}│\n")
+        w(f"│ 📍 地理位置: {info['location']:<53}│\n")
+        w(_CARD_MID)
+        w(f"│ 💬 帖子内容:\n")
+        # 处理多行内容
+        for line in info['caption'].split('\n'):
+            # 每行最多显示 64 个字符；大多数行不需要折行，直接写入（空行跳过，与原行为一致）
+            if len(line) <= 64:
+                if line:
+                    w(f"│    {line:<64}│\n")
+            else:
+                parts.extend(f"│    {line[start:start + 64]:<64}│\n" for start in range(0, len(line), 64))
+        w(_CARD_MID)
+        w(f"│ 🏷️  标签: {', '.join('#' + h for h in info['hashtags']) or '无':<54}│\n")
+        w(f"│ 👥 提及: {', '.join('@' + m.partition(' ')[0] for m in info['mentions']) or '无':<55}│\n")
+        w(_CARD_MID)
+        w(f"│ ❤️  点赞: {info['likes']:<54}│\n")
+        w(f"│ 💬 评论: {info['comments']:<55}│\n")
+        w(f"│ 📎 类型: {info['media_type']:<55}│\n")
+        post_link = info['post_url'] or f"https://instagram.com/p/{info['shortcode']}/"
+        w(f"│ 🔗 链接: {post_link:<55}│\n")
+        w(_CARD_BOT + "\n")
+    
+    output_file.write_bytes("".join(parts).encode('utf-8'))
     
     print(f"     📝 已保存帖子信息: {output_file}")
 
@@ -980,16 +1533,17 @@ def download_content_v2(account, posts_range, new_stories_count):
     url = f"https://www.instagram.com/{account}/"
     posts_success = True
     stories_success = True
+    # 帖子和快拍都下载到数据目录下（使用绝对路径）
+    data_dir = config.get_data_dir()
+    gallery_dl_path = get_gallery_dl_path()
     
     # 下载新帖子（同时下载元数据）
     if posts_range and posts_range[0] > 0 and posts_range[1] >= posts_range[0]:
         start, end = posts_range
         print(f"\n  [下载帖子] 下载媒体位置 {start}-{end}（含元数据）")
-        # 使用绝对路径
-        data_dir = config.get_data_dir()
         download_path = str(data_dir / config.DOWNLOAD_DIR / account / "posts")
         cmd = [
-            get_gallery_dl_path(),
+            gallery_dl_path,
             "--range", f"{start}-{end}",
             "--write-metadata",  # 同时下载元数据
             "--proxy", config.PROXY,
@@ -1000,20 +1554,16 @@ def download_content_v2(account, posts_range, new_stories_count):
         ]
         
         try:
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='ignore',
-                timeout=300
-            )
+            # 下载结果从下载目录中读取，输出只需逐行消费掉
+            returncode, stderr = run_gallery_dl_streaming(cmd, 300)
             
-            if result.returncode == 0:
+            if returncode == 0:
                 # 从下载目录中查找所有 JSON 元数据文件（不依赖 stdout）
                 download_dir = Path(download_path)
-                json_files = sorted([f.name for f in download_dir.glob('*.json') if f.is_file()])
-                media_files = sorted([f.name for f in download_dir.iterdir() if f.is_file() and not f.name.lower().endswith('.json')])
+                with os.scandir(download_path) as it:
+                    names = [entry.name for entry in it if entry.is_file()]
+                json_files = sorted(name for name in names if name.endswith(_JSON_EXTS))
+                media_files = sorted(name for name in names if not name.endswith(_JSON_EXTS))
                 
                 print(f"     ✅ 下载完成: {len(media_files)} 个媒体文件, {len(json_files)} 个元数据文件")
                 for f in media_files[:5]:
@@ -1023,19 +1573,18 @@ def download_content_v2(account, posts_range, new_stories_count):
                 
                 # 提取并保存文本信息
                 if json_files:
-                    # 构建完整的 JSON 文件路径
-                    json_paths = [str(download_dir / f) for f in json_files]
+                    # 构建完整的 JSON 文件路径（文件名来自目录列表，不含路径分隔符）
+                    base = download_path + os.sep
+                    json_paths = [base + f for f in json_files]
                     print(f"     [调试] JSON 文件数: {len(json_paths)}, 路径示例: {json_paths[:1]}...")
                     extract_and_save_post_info_from_paths(account, json_paths)
                 
                 # 下载间隔休眠
-                if hasattr(__builtins__, 'DOWNLOAD_SLEEP') and DOWNLOAD_SLEEP[1] > 0:
-                    sleep_time = random.randint(DOWNLOAD_SLEEP[0], DOWNLOAD_SLEEP[1])
-                    sleep_with_progress_bar(sleep_time, "下载间隔")
+                sleep_in_range(config.DOWNLOAD_SLEEP, "下载间隔")
             else:
-                print(f"     ⚠️  下载可能有问题，返回码: {result.returncode}")
-                if result.stderr:
-                    print(f"     错误: {result.stderr[:500]}")
+                print(f"     ⚠️  下载可能有问题，返回码: {returncode}")
+                if stderr:
+                    print(f"     错误: {stderr[:500]}")
                 posts_success = False
                 
         except subprocess.TimeoutExpired:
@@ -1048,10 +1597,9 @@ def download_content_v2(account, posts_range, new_stories_count):
     # 下载新快拍（不使用 range 限制，下载全部快拍）
     if new_stories_count > 0:
         print(f"\n  [下载快拍] 下载全部 {new_stories_count} 个新快拍")
-        # 使用绝对路径
         stories_download_path = str(data_dir / config.DOWNLOAD_DIR / account / "stories")
         cmd = [
-            get_gallery_dl_path(),
+            gallery_dl_path,
             # 不使用 --range 参数
             "--proxy", config.PROXY,
             "--cookies", config.COOKIES_FILE,
@@ -1061,27 +1609,20 @@ def download_content_v2(account, posts_range, new_stories_count):
         ]
         
         try:
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='ignore',
-                timeout=300
-            )
+            # 边下载边收集输出的文件名
+            downloaded_files = []
+            returncode, stderr = run_gallery_dl_streaming(cmd, 300, downloaded_files.append)
             
-            if result.returncode == 0:
-                # 解析下载的文件
-                downloaded_files = [line.strip().upper() for line in result.stdout.split('\n') if line.strip().upper()]
+            if returncode == 0:
                 print(f"     ✅ 下载完成: {len(downloaded_files)} 个文件")
                 for f in downloaded_files[:5]:
                     print(f"        📥 {f}")
                 if len(downloaded_files) > 5:
                     print(f"        ... 还有 {len(downloaded_files) - 5} 个")
             else:
-                print(f"     ⚠️  下载可能有问题，返回码: {result.returncode}")
-                if result.stderr:
-                    print(f"     错误: {result.stderr[:500]}")
+                print(f"     ⚠️  下载可能有问题，返回码: {returncode}")
+                if stderr:
+                    print(f"     错误: {stderr[:500]}")
                 stories_success = False
                 
         except subprocess.TimeoutExpired:
@@ -1094,8 +1635,6 @@ def download_content_v2(account, posts_range, new_stories_count):
     return posts_success, stories_success
 
 
-import sys
-
 def ask_yes_no(question, default="y", auto_mode=False):
     """询问用户是/否"""
     if auto_mode:
@@ -1104,7 +1643,7 @@ def ask_yes_no(question, default="y", auto_mode=False):
     
     while True:
         try:
-            answer = input(f"{question} (Y/n): ").strip().upper().lower()
+            answer = input(f"{question} (Y/n): ").strip().lower()
             if answer == '' or answer == 'y' or answer == 'yes':
                 return True
             elif answer == 'n' or answer == 'no':
@@ -1154,7 +1693,7 @@ def manage_accounts_menu():
             print("      输入 B 返回上一级，输入 M 返回主菜单")
             print(f"{'='*60}\n")
             
-            new_account = input("请输入用户名: ").strip().upper().lower()
+            new_account = input("请输入用户名: ").strip().lower()
             
             if new_account == 'b':
                 print("\n⏭️  返回上一级")
@@ -1176,7 +1715,7 @@ def manage_accounts_menu():
                 continue
             
             # 验证用户名格式（只允许字母、数字、下划线、点）
-            if not re.match(r'^[a-zA-Z0-9_.]+$', new_account):
+            if not _USERNAME_RE.match(new_account):
                 print(f"\n⚠️  用户名格式不正确，只允许字母、数字、下划线和点")
                 continue
             
@@ -1331,13 +1870,11 @@ def download_single_url(url):
     Returns:
         bool: 是否成功
     """
-    import re
-    
     # 从链接中提取账号名（如果是快拍）
     account = None
     if '/stories/' in url:
         # 快拍链接: /stories/username/id/
-        match = re.search(r'/stories/([^/]+)/', url)
+        match = _STORY_URL_RE.search(url)
         if match:
             account = match.group(1)
     
@@ -1358,20 +1895,14 @@ def download_single_url(url):
     
     try:
         print(f"   输出目录: {output_dir}")
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            encoding='utf-8',
-            errors='ignore',
-            timeout=300
+        # 边下载边按类型归类输出的文件名
+        media_files = []
+        json_files = []
+        returncode, stderr = run_gallery_dl_streaming(
+            cmd, 300, lambda line: (json_files if line.endswith(_JSON_EXTS) else media_files).append(line)
         )
         
-        if result.returncode == 0:
-            # 解析下载的文件
-            downloaded_files = [line.strip() for line in result.stdout.split('\n') if line.strip()]
-            media_files = [f for f in downloaded_files if not f.lower().endswith('.json')]
-            json_files = [f for f in downloaded_files if f.lower().endswith('.json')]
+        if returncode == 0:
             
             print(f"   ✅ 下载完成: {len(media_files)} 个媒体文件")
             for f in media_files:
@@ -1381,11 +1912,12 @@ def download_single_url(url):
             if json_files:
                 # 从第一个 JSON 文件中提取真实账号名
                 real_account = account
+                first_parsed = None
                 try:
                     json_path = Path(output_dir) / json_files[0]
-                    with open(json_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        real_account = data.get('username', '') or data.get('owner', {}).get('username', account)
+                    data = _load_json_file(json_path)
+                    first_parsed = (json_path.name, data)
+                    real_account = data.get('username', '') or (data.get('owner') or _EMPTY_DICT).get('username', account)
                 except Exception as e:
                     print(f"   ⚠️  无法从元数据提取账号名: {e}")
                 
@@ -1395,25 +1927,36 @@ def download_single_url(url):
                     print(f"   [调试] 目标目录: {new_output_dir}")
                     Path(new_output_dir).mkdir(parents=True, exist_ok=True)
                     
+                    # 一次列出临时目录中实际存在的文件，直接 os.replace 移动（无需逐个 exists()）
+                    # 只移动本次 gallery-dl 输出的文件，之前失败或超时残留在临时目录的文件不归入该账号
+                    wanted = {os.path.basename(f) for f in media_files + json_files}
                     moved_files = []
-                    for f in downloaded_files:
-                        src = Path(output_dir) / f
-                        dst = Path(new_output_dir) / f
-                        print(f"   [调试] 移动: {src} -> {dst}")
-                        if src.exists():
-                            src.rename(dst)
-                            moved_files.append(f)
-                        else:
-                            print(f"   [调试] 源文件不存在: {src}")
+                    with os.scandir(output_dir) as it:
+                        entries = [entry for entry in it if entry.name in wanted and entry.is_file()]
+                    missing = wanted.difference(entry.name for entry in entries)
+                    for name in sorted(missing):
+                        print(f"   [调试] 源文件不存在: {Path(output_dir) / name}")
+                    dst_prefix = new_output_dir + os.sep
+                    for entry in entries:
+                        dst = dst_prefix + entry.name
+                        print(f"   [调试] 移动: {entry.path} -> {dst}")
+                        try:
+                            os.replace(entry.path, dst)
+                            moved_files.append(entry.name)
+                        except OSError as e:
+                            print(f"   [调试] 移动失败: {entry.path} ({e})")
                     
-                    # 构建完整的 JSON 文件路径列表（在新目录中）
-                    new_json_paths = [str(Path(new_output_dir) / f) for f in json_files]
+                    # 构建完整的 JSON 文件路径列表（在新目录中，使用实际移动的文件名）
+                    base = new_output_dir + os.sep
+                    new_json_paths = [base + f for f in moved_files if f.endswith(_JSON_EXTS)]
                     print(f"   [调试] JSON 路径: {new_json_paths}")
                     
                     # 提取信息（传入完整路径）
                     if new_json_paths:
                         print(f"   [调试] 调用提取函数，账号: {real_account}")
-                        extract_and_save_post_info_from_paths(real_account, new_json_paths)
+                        # 第一个 JSON 已在上面解析过，直接复用，避免重复读取解析
+                        preparsed = {base + first_parsed[0]: first_parsed[1]} if first_parsed else None
+                        extract_and_save_post_info_from_paths(real_account, new_json_paths, preparsed)
                     
                     # 清理临时目录
                     try:
@@ -1424,9 +1967,9 @@ def download_single_url(url):
             
             return True
         else:
-            print(f"   ❌ 下载失败，返回码: {result.returncode}")
-            if result.stderr:
-                print(f"   错误: {result.stderr[:500]}")
+            print(f"   ❌ 下载失败，返回码: {returncode}")
+            if stderr:
+                print(f"   错误: {stderr[:500]}")
             return False
             
     except subprocess.TimeoutExpired:
@@ -1499,7 +2042,7 @@ def select_account_and_clear_type(archive, clear_type_name):
     print(f"  {len(accounts) + 2}. 返回")
     
     try:
-        acc_choice = int(input(f"\n请输入选项 (1-{len(accounts) + 2}): ").strip().upper())
+        acc_choice = int(input(f"\n请输入选项 (1-{len(accounts) + 2}): ").strip())
         if 1 <= acc_choice <= len(accounts):
             account = accounts[acc_choice - 1]
             if ask_yes_no(f"⚠️  确定要清除 {account} 的{clear_type_name}记录?"):
@@ -1695,34 +2238,105 @@ def validate_cookies_format(content):
     Returns:
         (is_valid, message): 是否有效，提示信息
     """
-    lines = content.strip().split('\n')
+    is_valid, message, _ = _inspect_cookies(content)
+    return is_valid, message
+
+
+def _inspect_cookies(content):
+    """
+    验证 Cookies 格式并统计有效 Cookie 行数（一次扫描同时得到两者）
     
-    # 检查是否为空
-    if not lines or not content.strip():
-        return False, "Cookies 内容为空"
+    Args:
+        content: Cookies 内容
     
-    # 检查是否有 Netscape 格式标记
-    has_netscape_header = any('# netscape' in line.lower() for line in lines[:5])
+    Returns:
+        (is_valid, message, valid_count): 是否有效，提示信息，有效 Cookie 行数
+    """
+    stripped = content.strip()
     
-    # 检查是否有 sessionid（关键 cookie）
-    has_sessionid = any('sessionid' in line.lower() for line in lines)
+    # 检查是否为空
+    if not stripped:
+        return False, "Cookies 内容为空", 0
     
-    # 检查是否有 csrftoken
-    has_csrftoken = any('csrftoken' in line.lower() for line in lines)
+    # 整段内容只转一次小写，不再拆分成行列表，各项检查都在整段字符串上完成
+    lowered = stripped.lower()
+    
+    # 检查是否有 sessionid（关键 cookie）和 csrftoken
+    has_sessionid = 'sessionid' in lowered
+    has_csrftoken = 'csrftoken' in lowered
     
     # 统计有效 cookie 行数（以 .instagram.com 开头）
-    valid_cookie_lines = [line for line in lines if line.strip().lower().startswith('.instagram.com')]
+    valid_count = sum(1 for _ in _COOKIE_LINE_RE.finditer(lowered))
     
-    if len(valid_cookie_lines) == 0:
-        return False, "未找到有效的 Instagram Cookies 行（应以 .instagram.com 开头）"
+    if valid_count == 0:
+        return False, "未找到有效的 Instagram Cookies 行（应以 .instagram.com 开头）", valid_count
     
     if not has_sessionid:
-        return False, "未找到 sessionid，Cookies 可能无效"
+        return False, "未找到 sessionid，Cookies 可能无效", valid_count
     
     if not has_csrftoken:
-        return False, "未找到 csrftoken，Cookies 可能无效"
+        return False, "未找到 csrftoken，Cookies 可能无效", valid_count
+    
+    return True, f"格式正确，找到 {valid_count} 个 Cookies", valid_count
+
+
+# Cookies 文件状态缓存（按路径、修改时间和大小判断文件是否变化）
+_COOKIES_STATUS_CACHE = {"key": None, "status": None}
+
+
+def get_cookies_file_status():
+    """
+    获取 Cookies 文件的验证状态（文件未变化时直接返回缓存结果，不再读取文件）
+    
+    Returns:
+        (is_valid, message, valid_count)，文件不存在时返回 None
+    """
+    try:
+        st = os.stat(config.COOKIES_FILE)
+    except FileNotFoundError:
+        return None
+    key = (config.COOKIES_FILE, st.st_mtime_ns, st.st_size)
+    if _COOKIES_STATUS_CACHE["key"] == key:
+        return _COOKIES_STATUS_CACHE["status"]
+    
+    with open(config.COOKIES_FILE, 'r', encoding='utf-8') as f:
+        content = f.read()
+    # 验证和有效行统计共用一次扫描，不再单独拆分行列表计数
+    status = _inspect_cookies(content)
+    _COOKIES_STATUS_CACHE["key"] = key
+    _COOKIES_STATUS_CACHE["status"] = status
+    return status
+
+
+def save_cookies_content(content):
+    """
+    保存 Cookies 内容到 config.COOKIES_FILE
+    
+    整体编码后一次写入临时文件再替换，避免分块写入和写入中断导致 Cookies 文件损坏
     
-    return True, f"格式正确，找到 {len(valid_cookie_lines)} 个 Cookies"
+    Args:
+        content: Cookies 内容
+    """
+    config.atomic_write_bytes(config.COOKIES_FILE, content.encode('utf-8'))
+    _resolve_cookies_path.cache_clear()
+    _COOKIES_STATUS_CACHE["key"] = None
+
+
+def import_cookies_file(src_path):
+    """
+    将已验证的 Cookies 文件按字节复制到 config.COOKIES_FILE
+    
+    直接由 shutil.copyfile 复制（可使用系统级零拷贝），无需再把已解码的内容重新编码写入；
+    同样先复制到临时文件再替换，避免导入中断导致 Cookies 文件损坏
+    
+    Args:
+        src_path: 来源 Cookies 文件路径
+    """
+    tmp = f"{config.COOKIES_FILE}.tmp"
+    shutil.copyfile(src_path, tmp)
+    os.replace(tmp, config.COOKIES_FILE)
+    _resolve_cookies_path.cache_clear()
+    _COOKIES_STATUS_CACHE["key"] = None
 
 
 def update_cookies_menu():
@@ -1732,16 +2346,12 @@ def update_cookies_menu():
     print(f"{'='*60}")
     
     # 显示当前 cookies 状态
-    cookies_file = Path(config.COOKIES_FILE)
-    if cookies_file.exists():
-        with open(cookies_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-        lines = content.strip().split('\n')
-        valid_lines = [line for line in lines if line.strip().lower().startswith('.instagram.com')]
-        is_valid, msg = validate_cookies_format(content)
+    status = get_cookies_file_status()
+    if status is not None:
+        is_valid, msg, valid_count = status
         print(f"\n📊 当前状态: {msg}")
         print(f"   文件: {config.COOKIES_FILE}")
-        print(f"   行数: {len(valid_lines)} 个有效 Cookies")
+        print(f"   行数: {valid_count} 个有效 Cookies")
     else:
         print(f"\n⚠️  当前没有 Cookies 文件")
         print(f"   文件路径: {config.COOKIES_FILE}")
@@ -1768,29 +2378,34 @@ def update_cookies_menu():
             print("      输入 B 返回上一级，输入 M 返回主菜单")
             print(f"{'='*60}\n")
             
-            lines = []
+            # 直接按行读取标准输入（保留行尾换行符），逐行写入内存缓冲区
+            readline = sys.stdin.readline
+            buf = io.StringIO()
+            write = buf.write
+            go_back = False
             while True:
-                try:
-                    line = input()
-                    if line.strip().upper() == 'END':
-                        break
-                    if line.strip().upper() == '9':
-                        print("\n⏭️  返回上一级")
-                        break  # 跳出输入循环
-                    if line.strip().upper() == '0':
-                        print("\n⏭️  返回主菜单")
-                        return  # 返回主菜单
-                    lines.append(line)
-                except EOFError:
+                line = readline()
+                if not line:
+                    break  # 输入结束（EOF）
+                command = line.strip().upper()
+                if command == 'END':
                     break
+                if command in ('B', '9'):
+                    print("\n⏭️  返回上一级")
+                    go_back = True
+                    break  # 跳出输入循环
+                if command in ('M', '0'):
+                    print("\n⏭️  返回主菜单")
+                    return  # 返回主菜单
+                write(line)
             
-            # 如果是因为输入9而跳出，继续显示更新方式菜单
-            if lines and lines[-1].strip().upper() == '9' if lines else False:
+            # 如果是因为输入 B 而跳出，继续显示更新方式菜单
+            if go_back:
                 continue
             
-            content = '\n'.join(lines)
+            content = buf.getvalue()
             
-            if not content.strip().upper():
+            if not content.strip():
                 print("\n⚠️  未输入任何内容，已取消")
                 continue  # 继续显示菜单
             
@@ -1802,8 +2417,7 @@ def update_cookies_menu():
             if is_valid:
                 if ask_yes_no("✅ 格式正确，是否保存?"):
                     try:
-                        with open(config.COOKIES_FILE, 'w', encoding='utf-8') as f:
-                            f.write(content)
+                        save_cookies_content(content)
                         print(f"\n✅ Cookies 已保存到: {config.COOKIES_FILE}")
                     except Exception as e:
                         print(f"\n❌ 保存失败: {e}")
@@ -1826,21 +2440,23 @@ def update_cookies_menu():
             print("     输入 B 返回上一级，输入 M 返回主菜单")
             print(f"{'='*60}\n")
             
-            file_path = input("请输入文件路径: ").strip().upper().strip('"')
+            # 原始大小写的路径用于打开文件，只有导航命令判断使用大写
+            raw_path = input("请输入文件路径: ").strip().strip('"')
+            command = raw_path.upper()
             
-            if file_path == 'B':
+            if command == 'B':
                 print("\n⏭️  返回上一级")
                 continue  # 继续显示菜单
             
-            if file_path == 'M':
+            if command == 'M':
                 print("\n⏭️  返回主菜单")
                 return  # 返回主菜单
             
-            if not file_path:
+            if not raw_path:
                 print("\n⚠️  未输入路径，已取消")
                 continue  # 继续显示菜单
             
-            file_path = Path(file_path)
+            file_path = Path(raw_path)
             
             if not file_path.exists():
                 print(f"\n❌ 文件不存在: {file_path}")
@@ -1858,8 +2474,7 @@ def update_cookies_menu():
                 if is_valid:
                     if ask_yes_no(f"✅ 格式正确，是否导入到 {config.COOKIES_FILE}?"):
                         try:
-                            with open(config.COOKIES_FILE, 'w', encoding='utf-8') as f:
-                                f.write(content)
+                            import_cookies_file(file_path)
                             print(f"\n✅ Cookies 已导入")
                             print(f"   来源: {file_path}")
                             print(f"   目标: {config.COOKIES_FILE}")
@@ -1925,7 +2540,7 @@ def settings_menu():
     while True:
         show_settings_menu()
         
-        choice = input("\n请输入选项 (1-9/R/B/M): ").strip().upper().upper()
+        choice = input("\n请输入选项 (1-9/R/B/M): ").strip().upper()
         
         if choice == 'R':
             if ask_yes_no("⚠️  确定要重置所有设置为默认值?"):
@@ -1998,19 +2613,19 @@ def settings_menu():
                 
                 # 对于文件类型，先检查用户输入的是否是目录路径
                 if path_type == 'file':
-                    path_obj = Path(new_val)
-                    # 获取路径的最后一部分（文件名或目录名）
-                    path_name = path_obj.name
+                    # 获取路径的最后一部分（文件名或目录名），纯字符串处理，无需构造 Path 对象
+                    path_name = os.path.basename(new_val.rstrip('/\\'))
+                    if path_name in ('.', '..'):
+                        path_name = ''  # "." / ".." 只表示目录
                     # 检查是否像目录路径（以分隔符结尾或没有扩展名）
-                    is_dir_like = (new_val.endswith(os.sep) or 
-                                   new_val.endswith('/') or 
-                                   new_val.endswith('\\') or
+                    is_dir_like = (new_val.endswith(_PATH_SEPS) or
                                    '.' not in path_name)  # 路径名中没有点号，说明没有扩展名
                     
                     # 调试信息
                     print(f"   [调试] 路径: {new_val}, 名称: {path_name}, 像目录: {is_dir_like}")
                     
                     if is_dir_like:
+                        path_obj = Path(new_val)
                         # 可能是想创建目录，询问用户
                         print(f"\n{'='*60}")
                         print(f"⚠️  您输入的路径 '{new_val}' 看起来像是一个目录")
@@ -2054,7 +2669,9 @@ def settings_menu():
             
             # 验证输入
             if choice in ['6', '7']:  # 时间间隔格式验证
-                if not re.match(r'^\d+-\d+$', new_val):
+                # 手工拆分 "最小值-最大值"，isdecimal 与正则 \d 的匹配范围一致
+                range_min, sep, range_max = new_val.partition('-')
+                if not (sep and range_min.isdecimal() and range_max.isdecimal()):
                     print("\n❌ 格式错误，应为: 最小值-最大值（例如: 30-90）")
                     continue
             
@@ -2089,8 +2706,8 @@ def configure_sleep_settings(auto_mode=False):
         (request_sleep, download_sleep): 请求休眠时间和下载休眠时间（秒）
     """
     if auto_mode:
-        # 自动模式使用默认配置
-        return config.SLEEP_REQUEST, config.SLEEP_DOWNLOAD
+        # 自动模式使用默认配置（设置中为 "最小值-最大值" 字符串，需解析为整数元组）
+        return config.parse_sleep_range(config.SLEEP_REQUEST), config.parse_sleep_range(config.SLEEP_DOWNLOAD)
     
     print(f"\n{'='*60}")
     print("⏱️  休眠时间配置")
@@ -2107,7 +2724,7 @@ def configure_sleep_settings(auto_mode=False):
     print("   • 大量下载：增加休眠时间更安全")
     
     print(f"\n{'='*60}")
-    choice = input("\n是否启用请求休眠? (y/n/推荐): ").strip().upper().lower()
+    choice = input("\n是否启用请求休眠? (y/n/推荐): ").strip().lower()
     
     if choice == '推荐' or choice == 'r':
         # 使用推荐设置
@@ -2162,6 +2779,16 @@ def configure_sleep_settings(auto_mode=False):
         return (0, 0), (0, 0)
 
 
+# 没有新内容的账号共用的操作结果记录（只读，不会被修改）
+_NO_CHANGE_RESULT = {
+    "new_posts": (),
+    "new_stories": (),
+    "summary": "     🔍 未发现新内容",
+    "archived": False,
+    "downloaded": False
+}
+
+
 def run_scan_and_download(scan_only_mode=False, auto_mode=False):
     """
     执行扫描和下载流程
@@ -2170,13 +2797,16 @@ def run_scan_and_download(scan_only_mode=False, auto_mode=False):
         scan_only_mode: 是否仅扫描
         auto_mode: 是否自动模式
     """
-    # 配置休眠时间
-    request_sleep, download_sleep = configure_sleep_settings(auto_mode)
+    # 配置休眠时间（自动模式直接使用配置值，无需进入交互式配置；"最小值-最大值" 字符串解析为整数元组）
+    if auto_mode:
+        request_sleep = config.parse_sleep_range(config.SLEEP_REQUEST)
+        download_sleep = config.parse_sleep_range(config.SLEEP_DOWNLOAD)
+    else:
+        request_sleep, download_sleep = configure_sleep_settings()
     
-    # 将休眠设置保存到全局，供其他函数使用
-    import builtins
-    builtins.REQUEST_SLEEP = request_sleep
-    builtins.DOWNLOAD_SLEEP = download_sleep
+    # 将休眠设置保存到 config 模块，供其他函数使用
+    config.REQUEST_SLEEP = request_sleep
+    config.DOWNLOAD_SLEEP = download_sleep
     
     # 询问扫描范围（仅扫描模式下）
     scan_range = None
@@ -2218,27 +2848,35 @@ def run_scan_and_download(scan_only_mode=False, auto_mode=False):
     
     archive = load_archive()
     
+    # 所有账号一次性批量扫描（帖子、快拍各启动一次 gallery-dl）
+    prefetched = scan_accounts_batch(config.ACCOUNTS, scan_range, archive)
+    
     # 记录每个账号的操作结果
     account_results = {}
     
+    # 是否已有账号执行过下载（扫描已在上面批量完成，循环中只有下载会访问 Instagram）
+    downloaded_before = False
+    
     for account in config.ACCOUNTS:
-        # 初始化账号结果记录
-        account_results[account] = {
-            "new_posts": [],
-            "new_stories": [],
-            "archived": False,
-            "downloaded": False
-        }
-        
-        all_new, new_posts, new_stories = check_account(account, archive, scan_range)
+        all_new, new_posts, new_stories = check_account(account, archive, scan_range, prefetched.get(account))
         
-        # 记录扫描结果
-        account_results[account]["new_posts"] = new_posts
-        account_results[account]["new_stories"] = new_stories
-        
-        if all_new:
-            # 计算唯一帖子数量
-            unique_post_count = len(set(m.get("post_id", m["id"].split('_')[0]) for m in new_posts))
+        if not all_new:
+            # 没有新内容：不触碰存档，结果记录共用同一个只读字典
+            account_results[account] = _NO_CHANGE_RESULT
+            print(f"\n  ℹ️  没有发现新内容，无需更新")
+        else:
+            # 记录扫描结果
+            # 计算唯一帖子数量（只计算一次，操作总结中直接复用）
+            unique_post_count = count_unique_posts(new_posts)
+            result = account_results[account] = {
+                "new_posts": new_posts,
+                "new_stories": new_stories,
+                # 操作总结中的扫描结果行（扫描时生成，总结时直接输出）
+                "summary": f"     � 扫描到: {unique_post_count} 个新帖子 ({len(new_posts)} 个媒体文件), {len(new_stories)} 个新快拍",
+                "archived": False,
+                "downloaded": False
+            }
+            
             print(f"\n  [新内容] 发现 {len(all_new)} 个新内容")
             print(f"     新帖子: {unique_post_count} 个帖子 ({len(new_posts)} 个媒体文件)")
             print(f"     新快拍: {len(new_stories)} 个")
@@ -2246,8 +2884,8 @@ def run_scan_and_download(scan_only_mode=False, auto_mode=False):
             # 询问是否更新存档
             print(f"\n{'='*60}")
             if ask_yes_no(f"💾 是否将新内容记录到存档?", auto_mode=auto_mode or scan_only_mode):
-                update_archive(account, new_posts, new_stories)
-                account_results[account]["archived"] = True
+                update_archive(account, new_posts, new_stories, archive)
+                result["archived"] = True
                 print(f"  ✅ 已更新存档")
             else:
                 print(f"  ⏭️  跳过存档更新")
@@ -2259,6 +2897,10 @@ def run_scan_and_download(scan_only_mode=False, auto_mode=False):
                 # 询问是否下载
                 print(f"\n{'='*60}")
                 if ask_yes_no(f"📥 是否下载这些新内容?", auto_mode=auto_mode):
+                    # 账号切换间隔：只在前面的账号执行过下载时休眠，没有新内容或跳过下载的账号不产生请求，无需等待
+                    if downloaded_before:
+                        sleep_in_range(config.REQUEST_SLEEP, "切换账号间隔")
+                    downloaded_before = True
                     print(f"\n  [开始下载] 账号: {account}")
                     # 计算正确的range：从第一个新内容的media_index到最后一个
                     if new_posts:
@@ -2276,20 +2918,12 @@ def run_scan_and_download(scan_only_mode=False, auto_mode=False):
                     )
                     
                     if posts_ok and stories_ok:
-                        account_results[account]["downloaded"] = True
+                        result["downloaded"] = True
                         print(f"\n  ✅ 全部下载完成")
                     else:
                         print(f"\n  ⚠️  部分下载可能失败")
                 else:
                     print(f"  ⏭️  跳过下载")
-        else:
-            print(f"\n  ℹ️  没有发现新内容，无需更新")
-    
-    # 账号切换前的休眠（如果不是最后一个账号）
-    if account != config.ACCOUNTS[-1]:
-        if hasattr(__builtins__, 'REQUEST_SLEEP') and REQUEST_SLEEP[1] > 0:
-            sleep_time = random.randint(REQUEST_SLEEP[0], REQUEST_SLEEP[1])
-            sleep_with_progress_bar(sleep_time, "切换账号间隔")
     
     # 显示操作总结
     print(f"\n{'='*60}")
@@ -2306,12 +2940,8 @@ def run_scan_and_download(scan_only_mode=False, auto_mode=False):
         
         print(f"\n  📱 {account}:")
         
-        # 扫描结果
-        if new_posts or new_stories:
-            unique_posts = len(set(m.get("post_id", m["id"].split('_')[0]) for m in new_posts))
-            print(f"     � 扫描到: {unique_posts} 个新帖子 ({len(new_posts)} 个媒体文件), {len(new_stories)} 个新快拍")
-        else:
-            print(f"     🔍 未发现新内容")
+        # 扫描结果（扫描时已生成）
+        print(result["summary"])
         
         # 存档状态
         if result["archived"]:
@@ -2395,6 +3025,12 @@ def main():
         show_help()
         return
     
+    # 加载配置并初始化数据文件
+    config.ensure_initialized()
+    
+    # 退出时将存档追加日志合并回存档文件
+    atexit.register(compact_archive)
+    
     # 显示配置文件初始化结果（由config.py自动创建）
     if config.INIT_RESULTS:
         print(f"\n{'='*60}")
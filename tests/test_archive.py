@@ -0,0 +1,83 @@
+"""
+存档测试（追加日志的重放和合并）
+
+运行: python -m unittest discover -s tests
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+import instagram_monitor
+
+
+_ORIGINAL_CWD = os.getcwd()
+_TEMP_DIR = None
+
+
+def setUpModule():
+    """在临时目录中初始化配置，避免测试读写仓库目录下的文件"""
+    global _TEMP_DIR
+    _TEMP_DIR = tempfile.TemporaryDirectory()
+    os.chdir(_TEMP_DIR.name)
+    with contextlib.redirect_stdout(io.StringIO()):
+        config.ensure_initialized()
+
+
+def tearDownModule():
+    os.chdir(_ORIGINAL_CWD)
+    _TEMP_DIR.cleanup()
+
+
+class ArchiveLogReplayTest(unittest.TestCase):
+    def setUp(self):
+        self.archive_path = instagram_monitor.get_archive_path()
+        self.log_path = instagram_monitor.get_archive_log_path()
+        self.archive_path.write_bytes(b'{"alice": {"posts": ["1.JPG"], "stories": []}}')
+
+    def tearDown(self):
+        for path in (self.archive_path, self.log_path):
+            if path.exists():
+                path.unlink()
+
+    def write_log(self, *lines):
+        self.log_path.write_bytes(b"".join(line + b"\n" for line in lines))
+
+    def test_invalid_records_do_not_stop_replay(self):
+        self.write_log(
+            b'{"add_posts": ["9.JPG"]}',
+            b'["not", "a", "record"]',
+            b'{"account": "alice", "add_posts": ["2.JPG"]',
+            b'{"account": "alice", "add_posts": ["3.JPG"], "add_stories": ["s.MP4"]}',
+        )
+        status = {}
+        with contextlib.redirect_stdout(io.StringIO()):
+            archive = instagram_monitor.load_archive(status)
+        self.assertTrue(status['complete'])
+        self.assertEqual(archive["alice"], {"posts": ["1.JPG", "3.JPG"], "stories": ["s.MP4"]})
+
+    def test_compact_merges_log_into_archive(self):
+        self.write_log(b'{"account": "bob", "add_posts": ["5.JPG"], "add_stories": []}')
+        with contextlib.redirect_stdout(io.StringIO()):
+            instagram_monitor.compact_archive()
+            archive = instagram_monitor.load_archive()
+        self.assertFalse(self.log_path.exists())
+        self.assertEqual(archive["bob"]["posts"], ["5.JPG"])
+
+    def test_compact_keeps_log_when_archive_is_corrupt(self):
+        self.archive_path.write_bytes(b'{"alice": ')
+        self.write_log(b'{"account": "bob", "add_posts": ["5.JPG"], "add_stories": []}')
+        with contextlib.redirect_stdout(io.StringIO()):
+            instagram_monitor.compact_archive()
+        self.assertTrue(self.log_path.exists())
+        self.assertEqual(self.archive_path.read_bytes(), b'{"alice": ')
+
+
+if __name__ == "__main__":
+    unittest.main()
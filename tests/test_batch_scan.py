@@ -0,0 +1,134 @@
+"""
+批量扫描测试（使用模拟的 gallery-dl 脚本，不访问网络）
+
+运行: python -m unittest discover -s tests
+"""
+
+import contextlib
+import io
+import os
+import stat
+import sys
+import tempfile
+import textwrap
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+import instagram_monitor
+
+
+# 模拟 gallery-dl：从标准输入读取账号URL，按 "用户名@文件名" 格式输出；
+# private 账号没有输出，向标准错误写入错误信息，最终以返回码 4 退出
+FAKE_GALLERY_DL = textwrap.dedent('''\
+    import sys
+
+    include = 'posts'
+    args = sys.argv[1:]
+    for i, arg in enumerate(args):
+        if arg == '-o' and 'include=' in args[i + 1]:
+            include = args[i + 1].split('=', 1)[1]
+    returncode = 0
+    for url in sys.stdin:
+        user = url.strip().rstrip('/').split('/')[-1]
+        if not user:
+            continue
+        if user == 'private':
+            sys.stderr.write(f"[instagram][error] Unable to access profile '{user}' (private account)\\n")
+            returncode = 4
+            continue
+        if include == 'stories':
+            print(f"# {user}@500.mp4", flush=True)
+        else:
+            for post_id in ('300', '200', '100'):
+                print(f"# {user}@{post_id}.jpg", flush=True)
+    sys.exit(returncode)
+''')
+
+
+_ORIGINAL_CWD = os.getcwd()
+_TEMP_DIR = None
+_FAKE_PATH = None
+
+
+def setUpModule():
+    """在临时目录中初始化配置，并生成模拟 gallery-dl 可执行文件"""
+    global _TEMP_DIR, _FAKE_PATH
+    _TEMP_DIR = tempfile.TemporaryDirectory()
+    os.chdir(_TEMP_DIR.name)
+    with contextlib.redirect_stdout(io.StringIO()):
+        config.ensure_initialized()
+
+    script = os.path.join(_TEMP_DIR.name, "fake_gallery_dl.py")
+    with open(script, 'w', encoding='utf-8') as f:
+        f.write(FAKE_GALLERY_DL)
+    if os.name == 'nt':
+        _FAKE_PATH = os.path.join(_TEMP_DIR.name, "gallery-dl.bat")
+        with open(_FAKE_PATH, 'w', encoding='utf-8') as f:
+            f.write(f'@"{sys.executable}" "{script}" %*\n')
+    else:
+        _FAKE_PATH = os.path.join(_TEMP_DIR.name, "gallery-dl")
+        with open(_FAKE_PATH, 'w', encoding='utf-8') as f:
+            f.write(f'#!/bin/sh\nexec "{sys.executable}" "{script}" "$@"\n')
+        os.chmod(_FAKE_PATH, os.stat(_FAKE_PATH).st_mode | stat.S_IEXEC)
+
+
+def tearDownModule():
+    os.chdir(_ORIGINAL_CWD)
+    _TEMP_DIR.cleanup()
+
+
+class BatchScanTest(unittest.TestCase):
+    def scan(self, accounts, archive=None):
+        with mock.patch.object(instagram_monitor, "get_gallery_dl_path", return_value=_FAKE_PATH), \
+                mock.patch.object(config, "MAX_CONSECUTIVE_DUPLICATES", 2), \
+                contextlib.redirect_stdout(io.StringIO()):
+            return instagram_monitor.scan_accounts_batch(accounts, None, archive)
+
+    def test_failed_account_does_not_fail_the_others(self):
+        prefetched = self.scan(["alice", "private"])
+        self.assertEqual(prefetched["alice"]["stories"], (["# 500.mp4"], 0))
+        self.assertEqual(prefetched["alice"]["posts"][1], 0)
+        self.assertEqual(prefetched["private"]["stories"], ([], 4))
+        self.assertEqual(prefetched["private"]["posts"], ([], 4))
+
+    def test_check_account_keeps_stories_of_healthy_account(self):
+        prefetched = self.scan(["alice", "private"])
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, _, new_stories = instagram_monitor.check_account("alice", {}, None, prefetched["alice"])
+        self.assertEqual([m["filename"] for m in new_stories], ["500.MP4"])
+
+    def test_stops_recording_account_at_duplicate_threshold(self):
+        archive = {"alice": {"posts": ["300.JPG", "200.JPG"]}}
+        prefetched = self.scan(["alice", "bob"], archive)
+        self.assertEqual(prefetched["alice"]["posts"], (["# 300.jpg", "# 200.jpg"], 0))
+        self.assertEqual(prefetched["bob"]["posts"], (["# 300.jpg", "# 200.jpg", "# 100.jpg"], 0))
+
+    def test_early_stop_of_last_account_counts_as_success(self):
+        archive = {"alice": {"posts": ["300.JPG", "200.JPG"]}}
+        prefetched = self.scan(["alice"], archive)
+        self.assertEqual(prefetched["alice"]["posts"], (["# 300.jpg", "# 200.jpg"], 0))
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, new_posts, _ = instagram_monitor.check_account("alice", archive, None, prefetched["alice"])
+        self.assertEqual(new_posts, [])
+
+
+class BatchAccountReturncodesTest(unittest.TestCase):
+    def test_success_applies_to_all_accounts(self):
+        codes = instagram_monitor.batch_account_returncodes(["a", "b"], {"a": [], "b": []}, 0, "")
+        self.assertEqual(codes, {"a": 0, "b": 0})
+
+    def test_unattributed_error_fails_silent_accounts(self):
+        codes = instagram_monitor.batch_account_returncodes(["a", "b"], {"a": ["1.jpg"], "b": []}, 1, "error")
+        self.assertEqual(codes, {"a": 0, "b": 1})
+
+    def test_error_naming_one_silent_account(self):
+        outputs = {"alice": [], "bob": [], "carol": ["1.jpg"]}
+        codes = instagram_monitor.batch_account_returncodes(list(outputs), outputs, 1, "[error] 'bob' not found")
+        self.assertEqual(codes, {"alice": 0, "bob": 1, "carol": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+"""
+配置模块测试（数据目录缓存在配置变更后失效）
+
+运行: python -m unittest discover -s tests
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+
+
+_ORIGINAL_CWD = os.getcwd()
+_TEMP_DIR = None
+
+
+def setUpModule():
+    """在临时目录中初始化配置，避免测试读写仓库目录下的文件"""
+    global _TEMP_DIR
+    _TEMP_DIR = tempfile.TemporaryDirectory()
+    os.chdir(_TEMP_DIR.name)
+    with contextlib.redirect_stdout(io.StringIO()):
+        config.ensure_initialized()
+
+
+def tearDownModule():
+    os.chdir(_ORIGINAL_CWD)
+    _TEMP_DIR.cleanup()
+
+
+class DataDirCacheTest(unittest.TestCase):
+    def setUp(self):
+        # 只通过 settings.json 决定数据目录
+        if os.path.exists(config.DATA_DIR_CONFIG):
+            os.remove(config.DATA_DIR_CONFIG)
+        config.reset_to_defaults()
+
+    def tearDown(self):
+        config.reset_to_defaults()
+
+    def test_set_config_data_dir_updates_cache(self):
+        self.assertEqual(config.get_data_dir(), Path('.'))
+        config.set_config('DATA_DIR', 'data')
+        self.assertEqual(config.get_data_dir(), Path('data'))
+        self.assertEqual(config.resolve_path('a.txt'), os.path.join('data', 'a.txt'))
+
+    def test_reset_to_defaults_updates_cache(self):
+        config.set_configs({'DATA_DIR': 'data'})
+        self.assertEqual(config.get_data_dir(), Path('data'))
+        config.reset_to_defaults()
+        self.assertEqual(config.get_data_dir(), Path('.'))
+
+
+class InitAllFilesTest(unittest.TestCase):
+    def test_data_dir_pointing_at_file_is_reported(self):
+        with open('not_a_dir', 'w', encoding='utf-8') as f:
+            f.write('x')
+        try:
+            results = config.init_all_files('not_a_dir')
+        finally:
+            os.remove('not_a_dir')
+        self.assertEqual(len(results), 1)
+        self.assertTrue(results[0].startswith("❌ 无法读取数据目录"))
+
+
+class BootstrapTest(unittest.TestCase):
+    def test_failed_bootstrap_is_retried(self):
+        with mock.patch.object(config, "_BOOTSTRAPPED", False), \
+                mock.patch.object(config, "load_accounts", side_effect=OSError("boom")):
+            with self.assertRaises(OSError):
+                config.ensure_initialized()
+            self.assertFalse(config._BOOTSTRAPPED)
+
+
+if __name__ == "__main__":
+    unittest.main()
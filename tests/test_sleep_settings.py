@@ -0,0 +1,117 @@
+"""
+休眠设置相关测试（自动模式下的休眠范围解析和账号切换间隔）
+
+运行: python -m unittest discover -s tests
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+import instagram_monitor
+
+
+_ORIGINAL_CWD = os.getcwd()
+_TEMP_DIR = None
+
+
+def setUpModule():
+    """在临时目录中初始化配置，避免测试读写仓库目录下的文件"""
+    global _TEMP_DIR
+    _TEMP_DIR = tempfile.TemporaryDirectory()
+    os.chdir(_TEMP_DIR.name)
+    with contextlib.redirect_stdout(io.StringIO()):
+        config.ensure_initialized()
+
+
+def tearDownModule():
+    os.chdir(_ORIGINAL_CWD)
+    _TEMP_DIR.cleanup()
+
+
+def _fake_new_content(account, archive, scan_range, prefetched):
+    """模拟 check_account：每个账号都有 1 个新帖子"""
+    new_posts = [{"id": f"{account}_1", "post_id": account, "media_index": 1, "filename": f"{account}_1.jpg"}]
+    return list(new_posts), new_posts, []
+
+
+def _fake_download(account, posts_range, new_stories_count):
+    """模拟 download_content_v2：与真实实现一样在下载后按 config.DOWNLOAD_SLEEP 休眠"""
+    instagram_monitor.sleep_in_range(config.DOWNLOAD_SLEEP, "下载间隔")
+    return True, True
+
+
+class ParseSleepRangeTest(unittest.TestCase):
+    def test_parses_setting_string(self):
+        self.assertEqual(config.parse_sleep_range("30-90"), (30, 90))
+
+    def test_invalid_input_disables_sleep(self):
+        for value in ("", "abc", "30-", "-90", "1-2-3", None):
+            self.assertEqual(config.parse_sleep_range(value), (0, 0))
+
+    def test_max_not_below_min(self):
+        self.assertEqual(config.parse_sleep_range("90-30"), (90, 90))
+
+
+class SleepInRangeTest(unittest.TestCase):
+    def sleeps_for(self, sleep_range):
+        sleeps = []
+        with mock.patch.object(instagram_monitor, "sleep_with_progress_bar",
+                               side_effect=lambda seconds, label: sleeps.append(seconds)):
+            instagram_monitor.sleep_in_range(sleep_range, "等待")
+        return sleeps
+
+    def test_accepts_int_tuple_and_setting_string(self):
+        self.assertEqual(self.sleeps_for((5, 5)), [5])
+        self.assertEqual(self.sleeps_for("7-7"), [7])
+
+    def test_zero_or_invalid_range_does_not_sleep(self):
+        for sleep_range in ((0, 0), "0-0", "abc", None):
+            self.assertEqual(self.sleeps_for(sleep_range), [])
+
+
+class AutoModeSleepTest(unittest.TestCase):
+    def run_auto(self, accounts):
+        """以自动模式运行扫描并下载，返回每次休眠的 (秒数, 标签)"""
+        sleeps = []
+        with mock.patch.object(config, "ACCOUNTS", accounts), \
+                mock.patch.object(config, "SLEEP_REQUEST", "30-90"), \
+                mock.patch.object(config, "SLEEP_DOWNLOAD", "20-60"), \
+                mock.patch.object(instagram_monitor, "load_archive", return_value={}), \
+                mock.patch.object(instagram_monitor, "scan_accounts_batch", return_value={}), \
+                mock.patch.object(instagram_monitor, "check_account", side_effect=_fake_new_content), \
+                mock.patch.object(instagram_monitor, "update_archive"), \
+                mock.patch.object(instagram_monitor, "download_content_v2", side_effect=_fake_download), \
+                mock.patch.object(instagram_monitor, "sleep_with_progress_bar",
+                                  side_effect=lambda seconds, label: sleeps.append((seconds, label))), \
+                contextlib.redirect_stdout(io.StringIO()):
+            instagram_monitor.run_scan_and_download(auto_mode=True)
+        return sleeps
+
+    def test_auto_mode_parses_sleep_ranges(self):
+        sleeps = self.run_auto(["alice"])
+        self.assertEqual(config.REQUEST_SLEEP, (30, 90))
+        self.assertEqual(config.DOWNLOAD_SLEEP, (20, 60))
+        self.assertEqual(len(sleeps), 1)
+        seconds, label = sleeps[0]
+        self.assertEqual(label, "下载间隔")
+        self.assertTrue(20 <= seconds <= 60)
+
+    def test_auto_mode_sleeps_between_account_downloads(self):
+        sleeps = self.run_auto(["alice", "bob", "carol"])
+        labels = [label for _, label in sleeps]
+        self.assertEqual(labels, ["下载间隔", "切换账号间隔", "下载间隔", "切换账号间隔", "下载间隔"])
+        for seconds, label in sleeps:
+            if label == "切换账号间隔":
+                self.assertTrue(30 <= seconds <= 90)
+
+
+if __name__ == "__main__":
+    unittest.main()